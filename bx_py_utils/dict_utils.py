@@ -1,8 +1,14 @@
 from __future__ import annotations
 
+import csv
 import dataclasses
+import html
+import io
+import json
+import operator
 import re
-from collections.abc import Generator, Iterable
+import tempfile
+from collections.abc import Callable, Generator, Iterable, Mapping
 from typing import Any
 
 
@@ -30,6 +36,91 @@ def dict_get(item, *keys) -> None | bool | str | dict | list:
     return item
 
 
+def compile_getter(*keys) -> Callable[[Any], Any]:
+    """
+    Build a nested dict `get()` callable for fixed keys, with the same results as `dict_get()`.
+    Useful if the same keys are applied to many items.
+
+    >>> get_x = compile_getter(1, 2)
+    >>> get_x({1: {2: 'X'}})
+    'X'
+    >>> get_x({1: 'no dict'}) is None
+    True
+    >>> compile_getter()('foo')
+    'foo'
+    """
+    if not keys:
+        return lambda item: item
+
+    if len(keys) == 1:
+        (key1,) = keys
+
+        def getter(item):
+            if isinstance(item, dict):
+                return item.get(key1)
+            return None
+
+    elif len(keys) == 2:
+        key1, key2 = keys
+
+        def getter(item):
+            if isinstance(item, dict):
+                item = item.get(key1)
+                if isinstance(item, dict):
+                    return item.get(key2)
+            return None
+
+    elif len(keys) == 3:
+        key1, key2, key3 = keys
+
+        def getter(item):
+            if isinstance(item, dict):
+                item = item.get(key1)
+                if isinstance(item, dict):
+                    item = item.get(key2)
+                    if isinstance(item, dict):
+                        return item.get(key3)
+            return None
+
+    else:
+
+        def getter(item):
+            for key in keys:
+                if isinstance(item, dict):
+                    item = item.get(key)
+                else:
+                    return None
+            return item
+
+    return getter
+
+
+def compile_multi_getter(paths: Mapping[Any, Iterable]) -> Callable[[Any], dict]:
+    """
+    Build a callable that extracts many nested values at once, see `compile_getter()`.
+
+    >>> get_info = compile_multi_getter({'name': ('user', 'name'), 'city': ('user', 'address', 'city')})
+    >>> get_info({'user': {'name': 'Joe', 'address': None}})
+    {'name': 'Joe', 'city': None}
+    """
+    getters = tuple((name, compile_getter(*keys)) for name, keys in paths.items())
+
+    def multi_getter(item) -> dict:
+        return {name: getter(item) for name, getter in getters}
+
+    return multi_getter
+
+
+def dict_get_many(records: Iterable, *keys) -> list:
+    """
+    `dict_get()` for many items.
+
+    >>> dict_get_many([{1: {2: 'X'}}, {1: {2: 'Y'}}, {1: None}, 'no dict'], 1, 2)
+    ['X', 'Y', None, None]
+    """
+    return list(map(compile_getter(*keys), records))
+
+
 def pluck(obj: dict, keys: Iterable[str]):
     """
     Extract values from a dict, if they are present
@@ -45,37 +136,175 @@ def pluck(obj: dict, keys: Iterable[str]):
     return res
 
 
-def dict_list2markdown(data: Iterable[dict]) -> Generator[str]:
+def pluck_many(records: Iterable[dict], keys: Iterable[str], as_columns: bool = False) -> list[dict] | dict[str, list]:
+    """
+    `pluck()` for many dicts at once.
+
+    Returns a list of dicts, with only the keys that are present in each record:
+    >>> records = [{'a': 1, 'b': 2, 'c': 3}, {'a': 4, 'c': 6}]
+    >>> pluck_many(records, ['a', 'b'])
+    [{'a': 1, 'b': 2}, {'a': 4}]
+
+    With `as_columns` returns one list per key instead. Missing values are None here:
+    >>> pluck_many(records, ['a', 'b'], as_columns=True)
+    {'a': [1, 4], 'b': [2, None]}
+    """
+    keys = tuple(dict.fromkeys(keys))  # Unique, but keep the order
+
+    if as_columns:
+        if not isinstance(records, (list, tuple)):
+            records = list(records)
+        return {key: [record.get(key) for record in records] for key in keys}
+
+    result: list[dict] = []
+    append = result.append
+    for record in records:
+        row = {}
+        for key in keys:
+            if key in record:
+                row[key] = record[key]
+        append(row)
+    return result
+
+
+NEWLINE_RE = re.compile(r'\r\n|\r|\n')
+
+
+def _iter_table(data: Iterable[dict], with_index: bool = True) -> Generator[tuple]:
+    """
+    Yields the header and then all rows of a table as tuples of raw values.
+    It's assumed that all dictionaries have the same keys.
+    """
+    keys = None
+    for index, entry in enumerate(data, start=1):
+        if keys is None:
+            keys = entry.keys()
+            yield ('index', *keys) if with_index else tuple(keys)
+        else:
+            assert entry.keys() == keys, f'Entry {index} has different keys: {entry.keys()} != {keys}'
+        values = [entry[key] for key in keys]
+        yield (index, *values) if with_index else tuple(values)
+
+
+def _to_markdown_cell(value: Any) -> str:
+    value = str(value)
+    if '\r' in value or '\n' in value:
+        value = NEWLINE_RE.sub('<br>', value)
+    return value.replace('|', r'\|')
+
+
+def dict_list2markdown(data: Iterable[dict], aligned: bool = False) -> Generator[str]:
     """
     Convert a list of dictionaries into a markdown table.
     It's assumed that all dictionaries have the same keys.
-    It's without cell width normalisation. (Use the great "tabulate" library for this)
 
-    >>> result=dict_list2markdown([{'a': 'A1', 'b': 'B1'}, {'a': 'A2', 'b': 'B2'}, {'a': 'A3', 'b': 'B3'}])
-    >>> print('\\n'.join(result))
+    >>> data = [{'a': 'A1', 'b': 'B1'}, {'a': 'A2', 'b': 'B2'}, {'a': 'A3', 'b': 'B3'}]
+    >>> print('\\n'.join(dict_list2markdown(data)))
     | index | a | b |
     | ----- | ----- | ----- |
     | 1 | A1 | B1 |
     | 2 | A2 | B2 |
     | 3 | A3 | B3 |
+
+    With `aligned` all cells are padded to the column width. The rows are spooled
+    to a temporary file to get the widths, so big tables don't need much memory:
+    >>> data = [{'a': 'A1', 'b': 'Long Value'}, {'a': 'A2', 'b': 'B2'}]
+    >>> for line in dict_list2markdown(data, aligned=True):
+    ...     print(line)
+    | index | a   | b          |
+    | ----- | --- | ---------- |
+    | 1     | A1  | Long Value |
+    | 2     | A2  | B2         |
     """
+    rows = _iter_table(data)
+    if aligned:
+        yield from _aligned_markdown(rows)
+        return
 
-    def to_cell_value(value: Any) -> str:
-        value = str(value)
-        value = re.sub(r'\r\n|\r|\n', '<br>', value)
-        value = value.replace('|', r'\|')
-        return value
+    for row_no, row in enumerate(rows):
+        yield f'| {" | ".join(map(_to_markdown_cell, row))} |'
+        if row_no == 0:
+            yield f'| ----- | {" | ".join(["-----"] * (len(row) - 1))} |'
 
-    keys = None
-    for index, entry in enumerate(data, start=1):
-        if keys is None:
-            keys = entry.keys()
-            yield f'| index | {" | ".join(to_cell_value(key) for key in keys)} |'
-            yield f'| ----- | {" | ".join(["-----"] * len(keys))} |'
-        else:
-            assert entry.keys() == keys, f'Entry {index} has different keys: {entry.keys()} != {keys}'
-        row = ' | '.join(to_cell_value(entry[key]) for key in keys)
-        yield f'| {index} | {row} |'
+
+def _aligned_markdown(rows: Iterable[tuple]) -> Generator[str]:
+    widths = None
+    with tempfile.TemporaryFile(mode='w+', encoding='utf-8') as spool:
+        for row in rows:
+            cells = [_to_markdown_cell(value) for value in row]
+            if widths is None:
+                widths = [max(len(cell), 3) for cell in cells]
+            else:
+                widths = [max(width, len(cell)) for width, cell in zip(widths, cells)]
+            spool.write(json.dumps(cells))
+            spool.write('\n')
+
+        if widths is None:
+            return
+
+        spool.seek(0)
+        for row_no, line in enumerate(spool):
+            cells = json.loads(line)
+            yield f'| {" | ".join(cell.ljust(width) for cell, width in zip(cells, widths))} |'
+            if row_no == 0:
+                yield f'| {" | ".join("-" * width for width in widths)} |'
+
+
+def dict_list2csv(data: Iterable[dict], with_index: bool = False, **csv_kwargs) -> Generator[str]:
+    """
+    Convert a list of dictionaries into CSV lines (with line terminators).
+    It's assumed that all dictionaries have the same keys.
+
+    >>> data = [{'a': 'A1', 'b': 'B, 1'}, {'a': 'A2', 'b': None}]
+    >>> for line in dict_list2csv(data, dialect='unix'):
+    ...     print(line, end='')
+    "a","b"
+    "A1","B, 1"
+    "A2",""
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, **csv_kwargs)
+    for row in _iter_table(data, with_index=with_index):
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _to_html_cell(value: Any) -> str:
+    value = html.escape(str(value))
+    if '\r' in value or '\n' in value:
+        value = NEWLINE_RE.sub('<br>', value)
+    return value
+
+
+def dict_list2html(data: Iterable[dict], with_index: bool = True) -> Generator[str]:
+    """
+    Convert a list of dictionaries into a HTML table.
+    It's assumed that all dictionaries have the same keys.
+
+    >>> for line in dict_list2html([{'a': 'A1', 'b': '<B1>'}, {'a': 'A2', 'b': 'B2'}]):
+    ...     print(line)
+    <table>
+    <thead><tr><th>index</th><th>a</th><th>b</th></tr></thead>
+    <tbody>
+    <tr><td>1</td><td>A1</td><td>&lt;B1&gt;</td></tr>
+    <tr><td>2</td><td>A2</td><td>B2</td></tr>
+    </tbody>
+    </table>
+    """
+    rows = _iter_table(data, with_index=with_index)
+    header = next(rows, None)
+    if header is None:
+        return
+
+    yield '<table>'
+    yield f'<thead><tr>{"".join(f"<th>{_to_html_cell(value)}</th>" for value in header)}</tr></thead>'
+    yield '<tbody>'
+    for row in rows:
+        yield f'<tr>{"".join(f"<td>{_to_html_cell(value)}</td>" for value in row)}</tr>'
+    yield '</tbody>'
+    yield '</table>'
 
 
 @dataclasses.dataclass
@@ -95,9 +324,128 @@ class DictCompareResult:
             return False
 
 
+@dataclasses.dataclass
+class DictDiffEntry:
+    kind: str  # 'changed', 'added' (only in current) or 'removed' (only in expected)
+    keys: tuple  # Keys to the node from the root
+    expected: Any
+    current: Any
+
+    @property
+    def path(self) -> str:
+        """
+        The keys as JSON Pointer (RFC 6901)
+        """
+        return ''.join(f'/{str(key).replace("~", "~0").replace("/", "~1")}' for key in self.keys)
+
+
+_MISSING = object()
+
+
+def _values_equal(current: Any, expected: Any) -> bool:
+    # Strict leaf compare: The types must be equal, too. No identity shortcut, so NaN is never equal.
+    return type(current) is type(expected) and current == expected
+
+
+def iter_dict_diff(
+    current: Any,
+    expected: Any,
+    *,
+    max_depth: int | None = None,
+    max_diffs: int | None = None,
+    strict_types: bool = True,
+) -> Generator[DictDiffEntry]:
+    """
+    Compare nested dicts/lists/tuples and yield all differences in document order.
+
+    >>> current = {'a': {'b': 1, 'c': [1, 2, 3]}, 'x/y': 'new'}
+    >>> expected = {'a': {'b': 2, 'c': [1, 2], 'd': None}}
+    >>> for entry in iter_dict_diff(current, expected):
+    ...     print(entry.kind, entry.path, entry.expected, entry.current)
+    changed /a/b 2 1
+    added /a/c/2 None 3
+    removed /a/d None None
+    added /x~1y None new
+
+    Stop after the first differences:
+    >>> [entry.path for entry in iter_dict_diff(current, expected, max_diffs=2)]
+    ['/a/b', '/a/c/2']
+
+    Values deeper than `max_depth` are compared as a whole:
+    >>> [entry.path for entry in iter_dict_diff(current, expected, max_depth=1)]
+    ['/a', '/x~1y']
+
+    The types must be equal, e.g.: 1 is not equal to True:
+    >>> [entry.path for entry in iter_dict_diff({'a': [1]}, {'a': [True]})]
+    ['/a/0']
+    >>> list(iter_dict_diff({'a': [1]}, {'a': [True]}, strict_types=False))
+    []
+
+    Identical objects are skipped without looking into them. Without `strict_types`
+    equal subtrees are skipped, too. (Compared by Python's == in C)
+    """
+    assert max_depth is None or max_depth >= 0, f'Invalid {max_depth=}'
+    assert max_diffs is None or max_diffs > 0, f'Invalid {max_diffs=}'
+
+    diff_count = 0
+    stack: list[tuple[str, tuple, Any, Any]] = [('changed', (), current, expected)]
+    while stack:
+        kind, keys, current, expected = stack.pop()
+
+        if kind != 'changed':
+            yield DictDiffEntry(kind=kind, keys=keys, expected=expected, current=current)
+        elif current is expected:
+            continue
+        else:
+            current_type = type(current)
+            same_type = current_type is type(expected)
+            if strict_types:
+                if current_type not in (dict, list, tuple) and _values_equal(current, expected):
+                    continue
+            elif current == expected:
+                continue
+
+            if same_type and (max_depth is None or len(keys) < max_depth):
+                if isinstance(current, dict):
+                    children = []
+                    for key, value in current.items():
+                        if key in expected:
+                            children.append(('changed', (*keys, key), value, expected[key]))
+                        else:
+                            children.append(('added', (*keys, key), value, None))
+                    for key, value in expected.items():
+                        if key not in current:
+                            children.append(('removed', (*keys, key), None, value))
+                    children.reverse()
+                    stack.extend(children)
+                    continue
+
+                if isinstance(current, (list, tuple)):
+                    common = min(len(current), len(expected))
+                    children = [('changed', (*keys, index), current[index], expected[index]) for index in range(common)]
+                    children.extend(
+                        ('added', (*keys, index), current[index], None) for index in range(common, len(current))
+                    )
+                    children.extend(
+                        ('removed', (*keys, index), None, expected[index]) for index in range(common, len(expected))
+                    )
+                    children.reverse()
+                    stack.extend(children)
+                    continue
+
+            if _values_equal(current, expected):
+                continue
+            yield DictDiffEntry(kind='changed', keys=keys, expected=expected, current=current)
+
+        diff_count += 1
+        if diff_count == max_diffs:
+            return
+
+
 def compare_dict_values(dict1: dict, dict2: dict) -> DictCompareResult:
     """
     Compare two dictionaries if values of the same keys are present and equal.
+    Only the top level is compared, use `iter_dict_diff()` to get all nested differences.
 
     >>> compare_dict_values({'a': 1}, {'a': 1, 'c': 2})
     DictCompareResult(correct_keys={'a': 1}, wrong_keys={}, skipped_keys={'c': {'expected': 2, 'current': None}})
@@ -123,16 +471,15 @@ def compare_dict_values(dict1: dict, dict2: dict) -> DictCompareResult:
     >>> compare_dict_values({'a': 1}, {'a': True})
     DictCompareResult(correct_keys={}, wrong_keys={'a': {'expected': True, 'current': 1}}, skipped_keys={})
     """
-    key_union = sorted(dict1.keys() | dict2.keys())
     correct_keys = {}
     wrong_keys = {}
     skipped_keys = {}
-    for key in key_union:
-        expected_value = dict2.get(key)
-        current_value = dict1.get(key)
-        if key not in dict1 or key not in dict2:
-            skipped_keys[key] = {'expected': expected_value, 'current': current_value}
-        elif type(expected_value) == type(current_value) and expected_value == current_value:  # noqa: E721
+    for key in sorted(dict1.keys() | dict2.keys()):
+        expected_value = dict2.get(key, _MISSING)
+        current_value = dict1.get(key, _MISSING)
+        if expected_value is _MISSING or current_value is _MISSING:
+            skipped_keys[key] = {'expected': dict2.get(key), 'current': dict1.get(key)}
+        elif _values_equal(current_value, expected_value):
             correct_keys[key] = expected_value
         else:
             wrong_keys[key] = {'expected': expected_value, 'current': current_value}
@@ -145,7 +492,7 @@ def compare_dict_values(dict1: dict, dict2: dict) -> DictCompareResult:
     return result
 
 
-def dict_prune_falsy(obj):
+def dict_prune_falsy(obj, in_place: bool = False, is_falsy: Callable[[Any], bool] = operator.not_):
     """
     Recursively remove all key-value pairs from a dictionary where the value is falsy.
     This includes values such as 0, '', None, False, empty lists, and empty dictionaries.
@@ -158,11 +505,81 @@ def dict_prune_falsy(obj):
 
     >>> dict_prune_falsy({'tuple': (0, 1, {'A1': 'ok', 'A2': None}, 2, 3)})
     {'tuple': (0, 1, {'A1': 'ok'}, 2, 3)}
+
+    Dicts in nested lists/tuples are pruned, too:
+    >>> dict_prune_falsy([[{'A1': 0}, ({'A2': 'ok', 'A3': ''},)]])
+    [[{}, ({'A2': 'ok'},)]]
+
+    What "falsy" means can be changed:
+    >>> dict_prune_falsy({'A': 0, 'B': None, 'C': {'D': None}}, is_falsy=lambda value: value is None)
+    {'A': 0, 'C': {}}
+
+    With `in_place` the dicts and lists will be modified instead of copied.
+    Tuples are immutable, so they will be always replaced (Use the return value!):
+    >>> data = {'A': None, 'B': {'C': 0, 'D': 1}}
+    >>> dict_prune_falsy(data, in_place=True) is data
+    True
+    >>> data
+    {'B': {'D': 1}}
+
+    Circular references can't be pruned:
+    >>> data = {'A': 1}
+    >>> data['self'] = data
+    >>> dict_prune_falsy(data)
+    Traceback (most recent call last):
+    ...
+    ValueError: Circular reference detected at key 'self'
     """
-    if isinstance(obj, dict):
-        return {k: v for k in obj if (v := dict_prune_falsy(obj[k]))}
-    if isinstance(obj, list):
-        return [dict_prune_falsy(item) if isinstance(item, dict) else item for item in obj]
-    if isinstance(obj, tuple):
-        return tuple(dict_prune_falsy(item) if isinstance(item, dict) else item for item in obj)
-    return obj
+    if not isinstance(obj, (dict, list, tuple)):
+        return obj
+
+    # Walk all containers with an explicit stack (no recursion limit) and collect them,
+    # parents before their children. Each container is referenced by (parent, key), so that
+    # copies and converted tuples can be stored in their parent.
+    root: list[Any] = [obj]
+    containers: list[tuple[dict | list, Any, bool]] = []
+    stack: list[tuple[dict | list, Any, int | None]] = [(root, 0, None)]
+    # id of each (original) container -> id of its parent. Only a container that is visited
+    # again (the same object at other places or a cycle) needs a walk up to the root:
+    parent_ids: dict[int, int | None] = {}
+    while stack:
+        parent, key, parent_id = stack.pop()
+        value = parent[key]
+        value_id = id(value)
+        if value_id in parent_ids:
+            ancestor_id = parent_id
+            while ancestor_id is not None:
+                if ancestor_id == value_id:
+                    raise ValueError(f'Circular reference detected at key {key!r}')
+                ancestor_id = parent_ids[ancestor_id]
+        parent_ids[value_id] = parent_id
+
+        is_tuple = isinstance(value, tuple)
+        if isinstance(value, dict):
+            if not in_place:
+                value = parent[key] = dict(value)
+            children = value.items()
+        else:
+            if is_tuple or not in_place:
+                value = parent[key] = list(value)
+            children = enumerate(value)
+        containers.append((parent, key, is_tuple))
+
+        for child_key, child in children:
+            if isinstance(child, (dict, list, tuple)):
+                stack.append((value, child_key, value_id))
+
+    # Prune the children before their parents:
+    for parent, key, is_tuple in reversed(containers):
+        value = parent[key]
+        if isinstance(value, dict):
+            if is_falsy is operator.not_:
+                falsy_keys = [child_key for child_key, child in value.items() if not child]
+            else:
+                falsy_keys = [child_key for child_key, child in value.items() if is_falsy(child)]
+            for child_key in falsy_keys:
+                del value[child_key]
+        elif is_tuple:
+            parent[key] = tuple(value)
+
+    return root[0]
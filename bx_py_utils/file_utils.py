@@ -1,13 +1,27 @@
 from __future__ import annotations
 
+import asyncio
 import hashlib
 import io
+import json
+import mmap
+import os
+import queue
 import re
+import sqlite3
+import string
 import tempfile
-from collections.abc import Iterable
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
 from pathlib import Path
 from typing import BinaryIO
 
+from bx_py_utils.filename_matcher import filename_matcher
+from bx_py_utils.hash_utils import url_safe_encode
+from bx_py_utils.path import assert_is_dir
+
 
 class FileError(AssertionError):
     """
@@ -76,6 +90,49 @@ class NamedTemporaryFile2(tempfile.TemporaryDirectory):
         super().__exit__(exc, value, tb)
 
 
+class SpooledTemporaryFile2:
+    """
+    Like NamedTemporaryFile2, but the content is kept in memory until it's bigger than `max_memory_size`.
+    Then it will be rolled over into a NamedTemporaryFile2 with the given filename.
+    """
+
+    def __init__(self, file_name: str, max_memory_size: int):
+        self.file_name = file_name
+        assert self.file_name
+        self.max_memory_size = max_memory_size
+        self.named_temp_file = None
+
+    def __enter__(self):
+        self.file_object = io.BytesIO()
+        return self
+
+    @property
+    def rolled_over(self) -> bool:
+        return self.named_temp_file is not None
+
+    def rollover(self):
+        if self.rolled_over:
+            return
+        named_temp_file = NamedTemporaryFile2(file_name=self.file_name).__enter__()  # noqa: PLC2801
+        position = self.file_object.tell()
+        with self.file_object.getbuffer() as buffer:
+            named_temp_file.file_object.write(buffer)
+        named_temp_file.file_object.seek(position)
+        self.file_object.close()
+        self.file_object = named_temp_file.file_object
+        self.named_temp_file = named_temp_file
+
+    def maybe_rollover(self):
+        if not self.rolled_over and self.file_object.getbuffer().nbytes > self.max_memory_size:
+            self.rollover()
+
+    def __exit__(self, exc, value, tb):
+        if self.named_temp_file:
+            self.named_temp_file.__exit__(exc, value, tb)
+        else:
+            self.file_object.close()
+
+
 class FileHasher:
     """
     Context Manager for generate different hashes from file content while processing a file.
@@ -104,10 +161,319 @@ class FileHasher:
         return {hash_name: hash.hexdigest() for hash_name, hash in self.hash.items()}
 
 
+def hash_file(
+    path: Path | str,
+    hash_names: Iterable | None = None,
+    chunk_size: int = 1024 * 1024,
+    use_mmap: bool = False,
+) -> FileHasher:
+    """
+    Hash the file content with FileHasher and return it. Avoids creating new bytes objects for every chunk:
+    The file is read into one reused buffer, or memory mapped if `use_mmap` is set.
+    The hashers get memoryview slices of it.
+    """
+    assert chunk_size > 0
+    path = Path(path)
+    with FileHasher(hash_names=hash_names) as hasher, path.open('rb', buffering=0) as file_object:
+        if use_mmap:
+            file_size = os.fstat(file_object.fileno()).st_size
+            if file_size:  # Empty files can't be mapped
+                with mmap.mmap(file_object.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    with memoryview(mapped) as view:
+                        for start in range(0, file_size, chunk_size):
+                            with view[start : start + chunk_size] as chunk:
+                                hasher(chunk)
+        else:
+            buffer = bytearray(chunk_size)
+            with memoryview(buffer) as view:
+                while size := file_object.readinto(buffer):
+                    with view[:size] as chunk:
+                        hasher(chunk)
+    return hasher
+
+
+def _stat_signature(path: Path) -> tuple[int, int, int]:
+    stat_result = path.stat()
+    return stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino
+
+
+class FileHashCache:
+    """
+    Persistent SQLite cache for file hashes. An entry is only used if the file has still
+    the same size, modification time and inode, so unchanged files are not read again.
+    """
+
+    def __init__(self, db_path: Path | str):
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS file_hashes ('
+            ' path TEXT PRIMARY KEY,'
+            ' size INTEGER NOT NULL,'
+            ' mtime_ns INTEGER NOT NULL,'
+            ' inode INTEGER NOT NULL,'
+            ' hashes TEXT NOT NULL,'
+            ' hashed_at REAL NOT NULL'
+            ')'
+        )
+        self.connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc, value, tb):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def get(self, path: Path | str, hash_names: Iterable | None = None, signature: tuple | None = None) -> dict | None:
+        """
+        Returns the cached hashes, e.g.: {'file_size': 3, 'md5': ...} or None if the file was changed.
+        """
+        path = Path(path).absolute()
+        if signature is None:
+            signature = _stat_signature(path)
+        row = self.connection.execute(
+            'SELECT hashes FROM file_hashes WHERE path=? AND size=? AND mtime_ns=? AND inode=?',
+            (str(path), *signature),
+        ).fetchone()
+        if row is None:
+            return None
+
+        hashes = json.loads(row[0])
+        hash_names = tuple(hash_names or FileHasher.DEFAULT_HASH_NAMES)
+        if not all(hash_name in hashes for hash_name in hash_names):
+            return None  # Hashed with other algorithms
+        return {'file_size': signature[0], **{hash_name: hashes[hash_name] for hash_name in hash_names}}
+
+    def set(self, path: Path | str, hexdigest_dict: dict, signature: tuple) -> None:
+        """
+        Store hashes. The `signature` must be created via _stat_signature() *before* the file was hashed!
+        """
+        path = Path(path).absolute()
+        self.connection.execute(
+            'INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?, ?, ?)',
+            (str(path), *signature, json.dumps(hexdigest_dict), time.time()),
+        )
+        self.connection.commit()
+
+    def hash_file(
+        self,
+        path: Path | str,
+        hash_names: Iterable | None = None,
+        chunk_size: int = 1024 * 1024,
+        verify: bool = False,
+    ) -> dict:
+        """
+        Returns the hashes, e.g.: {'file_size': 3, 'md5': ...} from cache or via hash_file().
+        With `verify` the file will always be hashed and the cache entry updated.
+        """
+        path = Path(path)
+        signature = _stat_signature(path)
+        if not verify and (hashes := self.get(path, hash_names=hash_names, signature=signature)):
+            return hashes
+
+        hasher = hash_file(path, hash_names=hash_names, chunk_size=chunk_size)
+        hexdigest_dict = hasher.hexdigest_dict()
+        self.set(path, hexdigest_dict, signature=signature)
+        return {'file_size': hasher.bytes_processed, **hexdigest_dict}
+
+    def invalidate(self, path: Path | str) -> None:
+        path = Path(path).absolute()
+        self.connection.execute('DELETE FROM file_hashes WHERE path=?', (str(path),))
+        self.connection.commit()
+
+    def evict(self, max_entries: int | None = None) -> int:
+        """
+        Remove entries of missing/changed files and, if `max_entries` is given, the oldest entries
+        over this limit. Returns the number of removed entries.
+        """
+        stale_paths = []
+        for path, *cached_signature in self.connection.execute('SELECT path, size, mtime_ns, inode FROM file_hashes'):
+            try:
+                signature = _stat_signature(Path(path))
+            except OSError:
+                signature = None
+            if signature != tuple(cached_signature):
+                stale_paths.append((path,))
+        self.connection.executemany('DELETE FROM file_hashes WHERE path=?', stale_paths)
+        removed = len(stale_paths)
+
+        if max_entries is not None:
+            cursor = self.connection.execute(
+                'DELETE FROM file_hashes WHERE path NOT IN'
+                ' (SELECT path FROM file_hashes ORDER BY hashed_at DESC, rowid DESC LIMIT ?)',
+                (max_entries,),
+            )
+            removed += cursor.rowcount
+
+        self.connection.commit()
+        return removed
+
+    def clear(self) -> None:
+        self.connection.execute('DELETE FROM file_hashes')
+        self.connection.commit()
+
+
+def _hash_tree_file(path: Path, hash_names: Iterable | None, chunk_size: int) -> dict:
+    try:
+        hasher = hash_file(path, hash_names=hash_names, chunk_size=chunk_size)
+    except OSError as err:
+        # e.g.: file vanished, dangling symlink, permission denied
+        return {'path': path, 'error': err}
+    return {'path': path, 'file_size': hasher.bytes_processed, **hasher.hexdigest_dict()}
+
+
+def hash_tree(
+    root: Path | str,
+    patterns: list | tuple = ('*',),
+    hash_names: Iterable | None = None,
+    workers: int = 4,
+    use_processes: bool = False,
+    chunk_size: int = 1024 * 1024,
+    cache: FileHashCache | None = None,
+    verify: bool = False,
+) -> Iterator[dict]:
+    """
+    Hash all files below `root` that match one of the fnmatch `patterns` in a thread (or process) pool.
+    Yields one dict per file in completion order, e.g.: {'path': Path(...), 'file_size': 3, 'md5': ...}
+    The dicts can be used with collect_hashes() / compare_hashes() (Use extra_keys=('file_size',))
+    Unchanged files are not hashed again, if a FileHashCache is given (Use `verify` to force hashing)
+    Files that can't be read don't stop the walk: They are yielded as {'path': Path(...), 'error': OSError(...)}
+    """
+    assert workers > 0
+    root = Path(root)
+    assert_is_dir(root)
+    if hash_names:
+        hash_names = tuple(hash_names)
+        FileHasher(hash_names=hash_names)  # Crash early on unsupported hash names
+
+    def collect(future):
+        result = future.result()
+        if cache:
+            signature = signatures.pop(future)
+            if 'error' not in result:
+                hexdigest_dict = {key: value for key, value in result.items() if key not in ('path', 'file_size')}
+                cache.set(result['path'], hexdigest_dict, signature=signature)
+        return result
+
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with executor_class(max_workers=workers) as executor:
+        pending = set()
+        signatures = {}
+        try:
+            for dir_path, dir_names, file_names in os.walk(root):
+                dir_names.sort()
+                for file_name in sorted(file_names):
+                    file_path = os.path.join(dir_path, file_name)
+                    if not filename_matcher(patterns=patterns, file_path=file_path):
+                        continue
+
+                    path = Path(file_path)
+                    if cache:
+                        try:
+                            signature = _stat_signature(path)
+                        except OSError as err:
+                            yield {'path': path, 'error': err}
+                            continue
+                        if not verify and (hashes := cache.get(path, hash_names=hash_names, signature=signature)):
+                            yield {'path': path, **hashes}
+                            continue
+
+                    future = executor.submit(_hash_tree_file, path, hash_names, chunk_size)
+                    pending.add(future)
+                    if cache:
+                        signatures[future] = signature
+
+                    if len(pending) >= workers * 2:
+                        # Don't queue up all files: Wait until some are done and yield them
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            yield collect(future)
+
+            for future in as_completed(pending):
+                yield collect(future)
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+
+class ParallelFileHasher(FileHasher):
+    """
+    Same as FileHasher, but every hash algorithm is updated in its own worker thread.
+    hashlib releases the GIL for big chunks, so the algorithms run in parallel on multi-core machines.
+    Must be used as context manager: The worker threads live until the context is left.
+
+    Only useful with several expensive algorithms (e.g. sha512, sha3_512, blake2b) and big chunks
+    on a machine with more than one CPU core. Otherwise the thread overhead makes it slower than FileHasher.
+
+    Chunks that are not `bytes` (e.g. a reused bytearray or memoryview from readinto()) are copied
+    once per chunk, because they are hashed later in the worker threads. Pass `bytes` to avoid this copy.
+    """
+
+    def __init__(self, hash_names: Iterable | None = None, max_queue_size: int = 4):
+        super().__init__(hash_names=hash_names)
+        assert max_queue_size > 0
+        self.max_queue_size = max_queue_size
+        self.chunk_queues: list[queue.Queue] = []
+        self.threads: list[threading.Thread] = []
+
+    def __enter__(self):
+        for hash_name, hash in self.hash.items():
+            chunk_queue = queue.Queue(maxsize=self.max_queue_size)
+            thread = threading.Thread(
+                target=self._worker,
+                args=(hash, chunk_queue),
+                name=f'{self.__class__.__name__}-{hash_name}',
+                daemon=True,
+            )
+            thread.start()
+            self.chunk_queues.append(chunk_queue)
+            self.threads.append(thread)
+        return self
+
+    @staticmethod
+    def _worker(hash, chunk_queue: queue.Queue):
+        while True:
+            chunk = chunk_queue.get()
+            try:
+                if chunk is None:
+                    return
+                hash.update(chunk)
+            finally:
+                chunk_queue.task_done()
+
+    def __call__(self, chunk):
+        assert self.threads, f'{self.__class__.__name__} must be used as context manager!'
+        if not isinstance(chunk, bytes):
+            # The chunk is processed later in the worker threads, so the caller must be able to reuse
+            # e.g. a bytearray buffer -> we need an immutable copy.
+            chunk = bytes(chunk)
+        for chunk_queue in self.chunk_queues:
+            chunk_queue.put(chunk)  # Blocks if the worker is "max_queue_size" chunks behind
+        self.bytes_processed += len(chunk)
+
+    def __exit__(self, exc, value, tb):
+        for chunk_queue in self.chunk_queues:
+            chunk_queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.chunk_queues.clear()
+        self.threads.clear()
+
+    def hexdigest_dict(self):
+        for chunk_queue in self.chunk_queues:
+            chunk_queue.join()  # Wait until all pending chunks are hashed
+        return super().hexdigest_dict()
+
+
 class TempFileHasher:
     """
     File like context manager that combines NamedTemporaryFile2 and FileHasher.
     Can also check the file size.
+    With `max_memory_size` the content is kept in memory until it's bigger (see: SpooledTemporaryFile2)
     """
 
     def __init__(
@@ -116,17 +482,25 @@ class TempFileHasher:
         hash_names: Iterable | None = None,
         avoid_empty_files=True,
         expected_files_size=None,
+        max_memory_size: int | None = None,
     ):
         self.file_name = file_name
         self.hash_names = hash_names
         self.avoid_empty_files = avoid_empty_files
         self.expected_files_size = expected_files_size
+        self.max_memory_size = max_memory_size
 
     def __enter__(self):
         # Init the FileHasher first: If one of the hash names are not supported,
         # crash early, before the temp file is created!
         self.hasher = FileHasher(hash_names=self.hash_names).__enter__()
-        self.temp_file = NamedTemporaryFile2(file_name=self.file_name).__enter__()
+        if self.max_memory_size is None:
+            self.temp_file = NamedTemporaryFile2(file_name=self.file_name).__enter__()
+        else:
+            self.temp_file = SpooledTemporaryFile2(
+                file_name=self.file_name,
+                max_memory_size=self.max_memory_size,
+            ).__enter__()
         return self
 
     def read(self, *args):
@@ -140,6 +514,8 @@ class TempFileHasher:
                 f' because this will result in incorrect hashes!'
             )
         self.temp_file.file_object.write(data)
+        if self.max_memory_size is not None:
+            self.temp_file.maybe_rollover()
         self.hasher(data)
 
     def seek(self, *args, **kwargs):
@@ -171,6 +547,9 @@ class TempFileHasher:
         if exc_type:
             raise
 
+        self._check_file_size()
+
+    def _check_file_size(self):
         bytes_processed = self.hasher.bytes_processed
         if self.avoid_empty_files and not bytes_processed:
             raise EmptyFileError(f'Nothing written to: {self.file_name!r}')
@@ -183,11 +562,97 @@ class TempFileHasher:
             )
 
 
+class AsyncTempFileHasher(TempFileHasher):
+    """
+    asyncio version of TempFileHasher: Use "async with" and "await write()".
+    Disk I/O and hashing run in an executor (default: the loop's default executor), so the event loop is not blocked.
+    Hashing the next chunk overlaps with the disk write of the previous one,
+    but only one disk write is pending at any time (backpressure).
+    """
+
+    def __init__(self, *args, executor: Executor | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.executor = executor
+        self.position = 0
+        self.pending_write = None
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def __aenter__(self):
+        await self._run(self.__enter__)
+        return self
+
+    async def _wait_for_pending_write(self):
+        if self.pending_write is not None:
+            pending_write, self.pending_write = self.pending_write, None
+            await pending_write
+
+    def _write(self, data):
+        self.temp_file.file_object.write(data)
+        if self.max_memory_size is not None:
+            self.temp_file.maybe_rollover()
+
+    async def write(self, data):
+        if self.position != self.hasher.bytes_processed:
+            # We are not at the end of the file!
+            raise RuntimeError(
+                f'Avoid non-linear writing to "{self.file_name}",'
+                f' because this will result in incorrect hashes!'
+            )
+        if not isinstance(data, bytes):
+            data = bytes(data)  # The caller may reuse e.g. a bytearray, while we write it in the background
+
+        await asyncio.gather(self._run(self.hasher, data), self._wait_for_pending_write())
+        self.pending_write = asyncio.ensure_future(self._run(self._write, data))
+        self.position += len(data)
+
+    async def read(self, *args):
+        await self._wait_for_pending_write()
+        data = await self._run(self.temp_file.file_object.read, *args)
+        self.position = self.temp_file.file_object.tell()
+        return data
+
+    async def seek(self, *args, **kwargs):
+        """
+        Note: Going back and forward is ok as long as you jump back to the end of the file
+              before the next write !
+        """
+        await self._wait_for_pending_write()
+        self.position = self.temp_file.file_object.seek(*args, **kwargs)
+        return self.position
+
+    def tell(self):
+        return self.position
+
+    async def flush(self):
+        await self._wait_for_pending_write()
+        await self._run(self.temp_file.file_object.flush)
+
+    async def close(self):
+        await self._wait_for_pending_write()
+        await self._run(self.temp_file.file_object.close)
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        try:
+            await self._wait_for_pending_write()
+        finally:
+            await self._run(self.temp_file.__exit__, exc_type, exc_val, exc_tb)
+        self.hasher.__exit__(exc_type, exc_val, exc_tb)
+        if exc_type:
+            return False
+
+        self._check_file_size()
+
+
+UNSAFE_FILENAME_CHARS_RE = re.compile(r'[^-_. \w]+')
+
+
 def safe_filename(input_str):
     """
     Makes an arbitrary input suitable to be used as a filename.
     """
-    return re.sub(r'[^-_. \w]+', '_', input_str)
+    return UNSAFE_FILENAME_CHARS_RE.sub('_', input_str)
 
 
 class OverlongFilenameError(AssertionError):
@@ -237,3 +702,83 @@ def cut_filename(file_name: str, max_length: int, min_name_len: int = 1) -> str:
     result = str(cut_path)
     assert len(result) == max_length
     return result
+
+
+def _split_suffix(file_name: str) -> tuple[str, str]:
+    # Same as Path.stem / Path.suffix, without creating a Path instance
+    index = file_name.rfind('.')
+    if 0 < index < len(file_name) - 1:
+        return file_name[:index], file_name[index:]
+    return file_name, ''
+
+
+FILENAME_HASH_ALPHABET = string.ascii_letters + string.digits
+
+
+class FilenameSanitizer:
+    """
+    Sanitize and cut many file names, like safe_filename() and cut_filename().
+    sanitize_many() returns unique names: Collisions get a short hash suffix, e.g.:
+
+    >>> FilenameSanitizer(max_length=12).sanitize_many(['a<1>.txt', 'a>1<.txt', 'a_long_name.txt'])
+    ['a_1_.txt', 'a_1__VBe.txt', 'a_long_n.txt']
+
+    Names that differ only in case collide, too (e.g. on Windows and macOS),
+    unless `case_sensitive` is set:
+
+    >>> FilenameSanitizer().sanitize_many(['Readme.txt', 'README.txt'])
+    ['Readme.txt', 'README_VfG.txt']
+    >>> FilenameSanitizer(case_sensitive=True).sanitize_many(['Readme.txt', 'README.txt'])
+    ['Readme.txt', 'README.txt']
+    """
+
+    def __init__(
+        self,
+        max_length: int | None = None,
+        min_name_len: int = 1,
+        hash_length: int = 3,
+        case_sensitive: bool = False,
+    ):
+        assert min_name_len >= 1
+        assert hash_length >= 1
+        self.max_length = max_length
+        self.min_name_len = min_name_len
+        self.hash_length = hash_length
+        self.case_sensitive = case_sensitive
+
+    def _cut_stem(self, file_name: str, stem: str, suffix: str, max_length: int) -> str:
+        cut_length = max_length - len(suffix)
+        if cut_length < self.min_name_len:
+            raise OverlongFilenameError(f'File name {file_name!r} can not be shortened to {max_length} characters.')
+        return stem[:cut_length]
+
+    def sanitize(self, file_name: str) -> str:
+        file_name = UNSAFE_FILENAME_CHARS_RE.sub('_', file_name)
+        if self.max_length is None or len(file_name) <= self.max_length:
+            return file_name
+        stem, suffix = _split_suffix(file_name)
+        return self._cut_stem(file_name, stem, suffix, self.max_length) + suffix
+
+    def _add_hash(self, source_name: str, file_name: str, attempt: int) -> str:
+        data = source_name if attempt == 0 else f'{source_name}\x00{attempt}'
+        # Only letters and digits: "." would create a fake extension and "~" is special in some shells
+        hash_digest = hashlib.sha3_512(data.encode('utf-8')).digest()
+        hash_suffix = '_' + url_safe_encode(hash_digest, alphabet=FILENAME_HASH_ALPHABET)[: self.hash_length]
+        stem, suffix = _split_suffix(file_name)
+        if self.max_length is not None and len(file_name) + len(hash_suffix) > self.max_length:
+            stem = self._cut_stem(file_name, stem, suffix, self.max_length - len(hash_suffix))
+        return f'{stem}{hash_suffix}{suffix}'
+
+    def sanitize_many(self, file_names: Iterable[str]) -> list[str]:
+        result = []
+        seen = set()
+        for source_name in file_names:
+            file_name = self.sanitize(source_name)
+            attempt = 0
+            unique_name = file_name
+            while (key := unique_name if self.case_sensitive else unique_name.casefold()) in seen:
+                unique_name = self._add_hash(source_name, file_name, attempt)
+                attempt += 1
+            seen.add(key)
+            result.append(unique_name)
+        return result
@@ -1,5 +1,10 @@
+import dataclasses
+import functools
 import hashlib
+import operator
 import string
+from collections.abc import Iterable
+from typing import BinaryIO
 
 from bx_py_utils.dict_utils import DictCompareResult, compare_dict_values
 
@@ -12,16 +17,60 @@ ALPHABET = (
 ) + string.digits
 
 
+@functools.lru_cache(maxsize=32)
+def _get_translation_table(alphabet: str) -> bytes | None:
+    """
+    Build a 256 byte lookup table that maps every byte value to the ASCII code of its alphabet character.
+    Returns None if the alphabet contains non-ASCII characters (can't be handled by bytes.translate())
+    """
+    if not alphabet.isascii():
+        return None
+    len_alphabet = len(alphabet)
+    return bytes(ord(alphabet[byte % len_alphabet]) for byte in range(256))
+
+
 def url_safe_encode(data, alphabet=ALPHABET):
     """
     Encode bytes into a URL safe string.
     Note:
         Use a URL safe alphabet (see RFC 3986) without umlauts
+
+    >>> url_safe_encode(b'foo bar')
+    '099KWV_'
     """
     assert isinstance(data, bytes)
 
-    len_alphabet = len(alphabet)
-    return ''.join(alphabet[char % len_alphabet] for char in data)
+    table = _get_translation_table(alphabet)
+    if table is None:
+        len_alphabet = len(alphabet)
+        return ''.join(alphabet[char % len_alphabet] for char in data)
+
+    return data.translate(table).decode('ascii')
+
+
+def url_safe_encode_many(data_list: Iterable[bytes], alphabet=ALPHABET) -> list[str]:
+    """
+    Encode many bytes into URL safe strings. Same result as url_safe_encode() for every item.
+
+    >>> url_safe_encode_many([b'foo', b'bar'])
+    ['099', 'WV_']
+    """
+    table = _get_translation_table(alphabet)
+    if table is None:
+        return [url_safe_encode(data, alphabet=alphabet) for data in data_list]
+
+    result = []
+    for data in data_list:
+        assert isinstance(data, bytes)
+        result.append(data.translate(table).decode('ascii'))
+    return result
+
+
+def _cut_safe_hash(safe_hash: str, max_size: int | None) -> str:
+    if max_size:
+        assert len(safe_hash) >= max_size, 'Hash digest too short for requested max size!'
+        safe_hash = safe_hash[:max_size]
+    return safe_hash
 
 
 def url_safe_hash(data, max_size=None, hasher_name='sha3_512', encoding='utf-8'):
@@ -41,11 +90,59 @@ def url_safe_hash(data, max_size=None, hasher_name='sha3_512', encoding='utf-8')
 
     # Convert hash digest bytes into URL safe string:
     safe_hash = url_safe_encode(hash_digest)
-    if max_size:
-        assert len(safe_hash) >= max_size, 'Hash digest too short for requested max size!'
-        safe_hash = safe_hash[:max_size]
+    return _cut_safe_hash(safe_hash, max_size)
 
-    return safe_hash
+
+@functools.lru_cache(maxsize=4096)
+def cached_url_safe_hash(data, max_size=None, hasher_name='sha3_512', encoding='utf-8') -> str:
+    """
+    Same as url_safe_hash(), but memorize the results in a bounded LRU cache.
+    Use `cached_url_safe_hash.cache_info()` for hit/miss counters and `cached_url_safe_hash.cache_clear()`
+
+    >>> cached_url_safe_hash('foo', max_size=16)
+    'tMXtn6KpcjzTdzTk'
+    """
+    return url_safe_hash(data, max_size=max_size, hasher_name=hasher_name, encoding=encoding)
+
+
+def url_safe_hash_many(data_list: Iterable, max_size=None, hasher_name='sha3_512', encoding='utf-8') -> list[str]:
+    """
+    Generate URL safe hashes for many strings/bytes. Same result as url_safe_hash() for every item.
+    The hasher is created only once and copied for every item.
+
+    >>> url_safe_hash_many(['foo', b'foo'], max_size=16)
+    ['tMXtn6KpcjzTdzTk', 'tMXtn6KpcjzTdzTk']
+    """
+    prototype = hashlib.new(hasher_name)
+
+    digests = []
+    for data in data_list:
+        if isinstance(data, str):
+            data = bytes(data, encoding=encoding)
+        hasher = prototype.copy()
+        hasher.update(data)
+        digests.append(hasher.digest())
+
+    return [_cut_safe_hash(safe_hash, max_size) for safe_hash in url_safe_encode_many(digests)]
+
+
+def url_safe_hash_stream(file_object: BinaryIO, max_size=None, hasher_name='sha3_512', chunk_size=64 * 1024) -> str:
+    """
+    Generate a URL safe hash with `max_size` from a binary file-like object, by reading it in chunks.
+    Same result as url_safe_hash() with the complete file content.
+
+    >>> import io
+    >>> url_safe_hash_stream(io.BytesIO(b'foo'), max_size=16)
+    'tMXtn6KpcjzTdzTk'
+    """
+    assert chunk_size > 0
+
+    hasher = hashlib.new(hasher_name)
+    while chunk := file_object.read(chunk_size):
+        hasher.update(chunk)
+
+    safe_hash = url_safe_encode(hasher.digest())
+    return _cut_safe_hash(safe_hash, max_size)
 
 
 KNOWN_HASH_ALGORITHMS = frozenset(hashlib.algorithms_available)
@@ -75,6 +172,58 @@ def collect_hashes(data: dict, *, extra_keys: tuple = ()) -> dict:
     return hashes
 
 
+class HashCollector:
+    """
+    Same as collect_hashes(), but for many records with the same key layout:
+    The hash keys are determined only once per key layout and the values are picked via itemgetter.
+
+    >>> collector = HashCollector(extra_keys=('file_size',))
+    >>> collector.collect_many([{'md5': '1', 'file_size': 1, 'foo': 'bar'}, {'md5': '2', 'file_size': 2, 'foo': 'baz'}])
+    [{'md5': '1', 'file_size': 1}, {'md5': '2', 'file_size': 2}]
+    """
+
+    MAX_LAYOUTS = 1024
+
+    def __init__(self, *, extra_keys: tuple = ()):
+        self.wanted_keys = KNOWN_HASH_ALGORITHMS.union(extra_keys)
+        self.layouts: dict[tuple, tuple] = {}
+
+    def _compile(self, layout: tuple) -> tuple:
+        hash_keys = tuple(key for key in layout if key in self.wanted_keys)
+        if len(hash_keys) == 1:
+            key = hash_keys[0]
+            getter = lambda data: (data[key],)
+        elif hash_keys:
+            getter = operator.itemgetter(*hash_keys)
+        else:
+            getter = lambda data: ()
+
+        if len(self.layouts) >= self.MAX_LAYOUTS:
+            self.layouts.clear()
+        self.layouts[layout] = compiled = (hash_keys, getter)
+        return compiled
+
+    def __call__(self, data: dict) -> dict:
+        layout = tuple(data)
+        try:
+            hash_keys, getter = self.layouts[layout]
+        except KeyError:
+            hash_keys, getter = self._compile(layout)
+        return dict(zip(hash_keys, getter(data)))
+
+    def collect_many(self, records: Iterable[dict]) -> list[dict]:
+        layouts = self.layouts
+        result = []
+        for data in records:
+            layout = tuple(data)
+            try:
+                hash_keys, getter = layouts[layout]
+            except KeyError:
+                hash_keys, getter = self._compile(layout)
+            result.append(dict(zip(hash_keys, getter(data))))
+        return result
+
+
 def compare_hashes(data1: dict, data2: dict, extra_keys: tuple = ()) -> DictCompareResult:
     """
     Compare hashes from two dictionaries. Return DictCompareResult with the results.
@@ -93,3 +242,60 @@ def compare_hashes(data1: dict, data2: dict, extra_keys: tuple = ()) -> DictComp
     hashes2 = collect_hashes(data2, extra_keys=extra_keys)
     result: DictCompareResult = compare_dict_values(hashes1, hashes2)
     return result
+
+
+@dataclasses.dataclass
+class HashVerifyReport:
+    correct: int = 0  # Number of entries with at least one and only equal hash values
+    wrong: int = 0  # Number of entries with at least one different hash value
+    skipped: int = 0  # Number of entries without any hash value present in both dicts
+    wrong_indices: list = dataclasses.field(default_factory=list)
+    skipped_indices: list = dataclasses.field(default_factory=list)
+
+    def verify_successful(self) -> bool | None:
+        if not self.correct and not self.wrong:
+            # Nothing compared -> undefined if the verification is ok or not
+            return None
+        return not self.wrong
+
+
+def verify_hashes(
+    current_items: Iterable[dict],
+    expected_items: Iterable[dict],
+    extra_keys: tuple = (),
+    fail_fast: bool = False,
+) -> HashVerifyReport:
+    """
+    Compare pairs of hash dictionaries, like compare_hashes() does for a single pair.
+    Every pair is marked as wrong on the first different hash value, without comparing the other ones.
+    With `fail_fast` the verification stops after the first wrong pair.
+
+    >>> verify_hashes([{'md5': '1'}, {'md5': '2'}, {'foo': 'bar'}], [{'md5': '1'}, {'md5': 'X'}, {'foo': 'bar'}])
+    HashVerifyReport(correct=1, wrong=1, skipped=1, wrong_indices=[1], skipped_indices=[2])
+    """
+    hash_keys = KNOWN_HASH_ALGORITHMS.union(extra_keys)
+
+    report = HashVerifyReport()
+    for index, (current, expected) in enumerate(zip(current_items, expected_items, strict=True)):
+        compared = False
+        for key, current_value in current.items():
+            if key not in hash_keys or key not in expected:
+                continue
+            expected_value = expected[key]
+            if type(expected_value) != type(current_value) or expected_value != current_value:  # noqa: E721
+                report.wrong += 1
+                report.wrong_indices.append(index)
+                break
+            compared = True
+        else:
+            if compared:
+                report.correct += 1
+            else:
+                report.skipped += 1
+                report.skipped_indices.append(index)
+            continue
+
+        if fail_fast:
+            break
+
+    return report
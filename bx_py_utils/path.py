@@ -1,7 +1,23 @@
+import collections
+import contextlib
+import gzip
+import io
 import json
 import os
 import tempfile
+import threading
+from collections.abc import Generator, Iterable, Iterator
 from pathlib import Path
+from typing import Any, Literal
+
+
+try:
+    import orjson  # orjson is optional requirement
+except ModuleNotFoundError:
+    orjson = None  # type: ignore[assignment]
+
+
+Durability = Literal['none', 'file', 'file+dir']
 
 
 def assert_is_dir(path):
@@ -28,24 +44,141 @@ def assert_is_file(path):
         raise FileNotFoundError(f'File does not exists: "{path}"')
 
 
-def read_json_file(path):
+def read_json_file(path, lazy=False):
+    """
+    Read a JSON file.
+
+    With `lazy` the file is parsed only once (per process) and then served from a cache,
+    until the file changes (other mtime or size). The cached data is shared by all callers,
+    so it's returned as ReadOnlyDict/ReadOnlyList: Modifying it raises a TypeError.
+    Read the file without `lazy` to get modifiable data.
+    """
     if not isinstance(path, Path):
         path = Path(path)
 
+    if lazy:
+        return _get_cached_json(path.absolute())
+
     with path.open('rb') as f:
         return json.load(f)
 
 
-def write_json_file(path: Path | str, data: dict, **json_kwargs):
-    path = Path(path)
+def _read_only(*args, **kwargs):
+    raise TypeError('Cached JSON data is read-only! (Use read_json_file() without "lazy" to modify the data)')
+
+
+class ReadOnlyDict(dict):  # noqa: FURB189 - must be a real dict, e.g. for json.dumps()
+    """
+    dict that can't be modified, used by read_json_file() for cached data.
+    """
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return self.__class__, (dict(self),)
+
+
+class ReadOnlyList(list):  # noqa: FURB189
+    """
+    list that can't be modified, used by read_json_file() for cached data.
+    """
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = clear = extend = insert = pop = remove = reverse = sort = _read_only
+
+    def __reduce__(self):
+        return self.__class__, (list(self),)
+
+
+def _read_only_list(items: list) -> ReadOnlyList:
+    # Lists of dicts are already converted by _read_only_object(), but not lists of lists:
+    return ReadOnlyList(_read_only_list(item) if type(item) is list else item for item in items)
+
+
+def _read_only_object(pairs: list) -> ReadOnlyDict:
+    return ReadOnlyDict((key, _read_only_list(value) if type(value) is list else value) for key, value in pairs)
+
+
+LAZY_JSON_FILES_MAX_SIZE = 128
+_LAZY_JSON_FILES: collections.OrderedDict[Path, tuple[tuple, Any]] = collections.OrderedDict()
+_LAZY_JSON_FILES_LOCK = threading.Lock()
+
+
+def _get_cached_json(path: Path) -> Any:
+    """
+    Returns the cached data of `path` or parse the file, if it has changed.
+    """
+    stat_result = path.stat()
+    signature = (stat_result.st_mtime_ns, stat_result.st_size)
+
+    with _LAZY_JSON_FILES_LOCK:
+        entry = _LAZY_JSON_FILES.get(path)
+        if entry is not None and entry[0] == signature:
+            _LAZY_JSON_FILES.move_to_end(path)
+            return entry[1]
+
+    # Parse outside the lock, so that other files can be served meanwhile:
+    with path.open('rb') as f:
+        data = json.load(f, object_pairs_hook=_read_only_object)
+    if type(data) is list:
+        data = _read_only_list(data)
+
+    with _LAZY_JSON_FILES_LOCK:
+        _LAZY_JSON_FILES[path] = (signature, data)
+        _LAZY_JSON_FILES.move_to_end(path)
+        while len(_LAZY_JSON_FILES) > LAZY_JSON_FILES_MAX_SIZE:
+            _LAZY_JSON_FILES.popitem(last=False)  # Remove the least recently used file
+    return data
+
+
+def _dump_json_fast(data) -> bytes:
+    """
+    Compact JSON via orjson, if installed. Otherwise via json with the same separators.
+    Non-str dict keys are converted to strings in both cases, but the output can still differ:
+    orjson writes NaN/Infinity as null (json: NaN/Infinity) and supports more types, e.g. datetime and UUID.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
 
+def _write_json(file_object, data, fast: bool, json_kwargs: dict) -> None:
+    if fast:
+        file_object.write(_dump_json_fast(data))
+    else:
+        # Stream the JSON into the file, without building the whole document in memory:
+        text_file = io.TextIOWrapper(file_object, encoding='utf-8')
+        try:
+            json.dump(data, text_file, **json_kwargs)
+        finally:
+            text_file.detach()  # flush, but don't close the underlying file
+
+
+def _fsync_dir(path: Path) -> None:
+    if os.name == 'nt':
+        return  # Directories can't be opened on Windows
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextlib.contextmanager
+def _atomic_open(path: Path, fsync: bool) -> Generator[Any]:
+    """
+    Open a temp file for writing in the destination directory and rename it to `path` at the end.
+    """
     with tempfile.NamedTemporaryFile(
-        dir=path.parent, prefix=f'{path.name}.', suffix='.tmp', mode='w', encoding='utf-8', delete=False
+        dir=path.parent, prefix=f'{path.name}.', suffix='.tmp', mode='wb', delete=False
     ) as tmp_handle:
         tmp_path = Path(tmp_handle.name)
         try:
-            json.dump(data, tmp_handle, **json_kwargs)
+            yield tmp_handle
             tmp_handle.flush()
+            if fsync:
+                os.fsync(tmp_handle.fileno())
 
             tmp_path.rename(path)
         except BaseException:
@@ -54,6 +187,130 @@ def write_json_file(path: Path | str, data: dict, **json_kwargs):
             raise
 
 
+def write_json_file(
+    path: Path | str, data: dict, *, durability: Durability = 'none', fast: bool = False, **json_kwargs
+):
+    """
+    Write JSON atomically via a temp file and rename. Optional with fsync, see `durability`:
+     * 'none' - no fsync (fastest)
+     * 'file' - fsync the file content before the rename
+     * 'file+dir' - also fsync the directory, so the rename survives a crash
+    With `fast` the data is serialized compact (and via orjson, if installed).
+    Note: With orjson NaN/Infinity are written as null and more types are supported (e.g. datetime, UUID)
+    """
+    write_json_files({path: data}, durability=durability, fast=fast, **json_kwargs)
+
+
+def write_json_files(files: dict, *, durability: Durability = 'none', fast: bool = False, **json_kwargs):
+    """
+    Write many JSON files atomically, like write_json_file(), but fsync every directory only once.
+    `files` is a dict of {path: data}
+    """
+    assert durability in ('none', 'file', 'file+dir'), f'Unknown durability: {durability!r}'
+    if fast:
+        assert not json_kwargs, 'json_kwargs are not supported in fast mode!'
+    fsync = durability != 'none'
+
+    directories = set()
+    for path, data in files.items():
+        path = Path(path)
+        with _atomic_open(path, fsync=fsync) as file_object:
+            _write_json(file_object, data, fast=fast, json_kwargs=json_kwargs)
+        directories.add(path.parent)
+
+    if durability == 'file+dir':
+        for directory in directories:
+            _fsync_dir(directory)
+
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+def _zstd_open(file_object, mode: str):
+    try:
+        from compression import zstd  # New in Python 3.14
+    except ImportError:
+        try:
+            import zstandard  # zstandard is optional requirement
+        except ImportError as err:
+            raise ImportError(f'{err} (Hint: Install "zstandard" package)') from err
+
+        if mode == 'rb':
+            return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(file_object, read_across_frames=True))
+        return zstandard.ZstdCompressor().stream_writer(file_object, closefd=False)
+
+    return zstd.ZstdFile(file_object, mode=mode)
+
+
+def iter_json_lines(path: Path | str) -> Iterator[Any]:
+    """
+    Read a JSON Lines file line by line. gzip and zstd compressed files are detected automatically.
+    Empty lines are skipped.
+    """
+    path = Path(path)
+    with path.open('rb') as file_object:
+        magic = file_object.peek(4)[:4]
+        if magic.startswith(GZIP_MAGIC):
+            reader = gzip.GzipFile(fileobj=file_object, mode='rb')
+        elif magic == ZSTD_MAGIC:
+            reader = _zstd_open(file_object, mode='rb')
+        else:
+            reader = file_object
+
+        with reader:
+            for line in reader:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def write_json_lines(
+    path: Path | str,
+    items: Iterable,
+    *,
+    durability: Durability = 'none',
+    buffer_size: int = 64 * 1024,
+    **json_kwargs,
+) -> int:
+    """
+    Write JSON Lines atomically, like write_json_file(). Returns the number of written lines.
+    The file will be gzip/zstd compressed, if the file name ends with ".gz"/".zst"
+    Lines are collected up to `buffer_size` bytes before they are written.
+    """
+    assert durability in ('none', 'file', 'file+dir'), f'Unknown durability: {durability!r}'
+    assert 'indent' not in json_kwargs, 'JSON Lines can not be indented!'
+    path = Path(path)
+
+    count = 0
+    with _atomic_open(path, fsync=durability != 'none') as file_object:
+        if path.suffix == '.gz':
+            writer = gzip.GzipFile(filename=path.name, fileobj=file_object, mode='wb')
+        elif path.suffix == '.zst':
+            writer = _zstd_open(file_object, mode='wb')
+        else:
+            writer = contextlib.nullcontext(file_object)
+
+        with writer as output:
+            buffer = []
+            buffered_size = 0
+            for item in items:
+                line = json.dumps(item, **json_kwargs).encode('utf-8') + b'\n'
+                buffer.append(line)
+                buffered_size += len(line)
+                count += 1
+                if buffered_size >= buffer_size:
+                    output.write(b''.join(buffer))
+                    buffer.clear()
+                    buffered_size = 0
+            if buffer:
+                output.write(b''.join(buffer))
+
+    if durability == 'file+dir':
+        _fsync_dir(path.parent)
+
+    return count
+
+
 class ChangeCurrentWorkDir:
     """
     Context Manager change the "CWD" to an other directory.
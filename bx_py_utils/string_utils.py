@@ -1,15 +1,27 @@
 from __future__ import annotations
 
+import functools
 import hashlib
 import re
 import unicodedata
+from array import array
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
 from typing import Literal
 from uuid import UUID
 
 
-def levenshtein_distance(word1: str, word2: str) -> int:
+try:
+    from rapidfuzz.distance import Levenshtein as rapidfuzz_levenshtein  # rapidfuzz is optional requirement
+except ModuleNotFoundError:
+    rapidfuzz_levenshtein = None
+
+
+def levenshtein_distance(word1: str, word2: str, max_distance: int | None = None) -> int:
     """
     Calculates the Levenshtein distance between two strings.
+    Stops early if the distance is greater than `max_distance` and returns `max_distance + 1` in this case.
+    Uses "rapidfuzz" if installed.
 
     >>> levenshtein_distance('planet', 'planetary')
     3
@@ -17,26 +29,119 @@ def levenshtein_distance(word1: str, word2: str) -> int:
     2
     >>> levenshtein_distance('book', 'book')
     0
+    >>> levenshtein_distance('orchestration', 'container', max_distance=3)
+    4
     """
-    if len(word1) < len(word2):
-        return levenshtein_distance(word2, word1)
+    if rapidfuzz_levenshtein is not None:
+        return rapidfuzz_levenshtein.distance(word1, word2, score_cutoff=max_distance)
+    return _levenshtein_distance(word1, word2, max_distance)
 
-    if len(word2) == 0:
+
+def _levenshtein_distance(word1: str, word2: str, max_distance: int | None = None) -> int:
+    """
+    Pure Python Levenshtein distance: Use the bit-parallel algorithm, but the banded one
+    for long strings with a small `max_distance`, because it can stop early.
+    """
+    if max_distance is not None and min(len(word1), len(word2)) > 64 and max_distance < 32:
+        return _levenshtein_banded(word1, word2, max_distance)
+
+    distance = _levenshtein_myers(word1, word2)
+    if max_distance is not None and distance > max_distance:
+        return max_distance + 1
+    return distance
+
+
+def _levenshtein_myers(word1: str, word2: str) -> int:
+    """
+    Bit-parallel Levenshtein distance (Myers 1999 / Hyyrö 2001): One bit per character of the shorter string.
+    Needs O(n) integer operations. Python integers have unlimited size, so longer strings just use more
+    machine words inside of the integer operations ("blocked" variant).
+    """
+    if len(word1) < len(word2):
+        word1, word2 = word2, word1
+    length = len(word2)
+    if length == 0:
         return len(word1)
 
-    previous_row = range(len(word2) + 1)
+    pattern_bits: dict[str, int] = {}
+    for i, char in enumerate(word2):
+        pattern_bits[char] = pattern_bits.get(char, 0) | (1 << i)
+
+    all_bits = (1 << length) - 1
+    last_bit = 1 << (length - 1)
+    positive_vertical = all_bits
+    negative_vertical = 0
+    distance = length
+    for char in word1:
+        equal = pattern_bits.get(char, 0)
+        x_vertical = equal | negative_vertical
+        x_horizontal = (((equal & positive_vertical) + positive_vertical) ^ positive_vertical) | equal
+        positive_horizontal = negative_vertical | (~(x_horizontal | positive_vertical) & all_bits)
+        negative_horizontal = positive_vertical & x_horizontal
+        if positive_horizontal & last_bit:
+            distance += 1
+        elif negative_horizontal & last_bit:
+            distance -= 1
+        positive_horizontal = ((positive_horizontal << 1) | 1) & all_bits
+        negative_horizontal = (negative_horizontal << 1) & all_bits
+        positive_vertical = negative_horizontal | (~(x_vertical | positive_horizontal) & all_bits)
+        negative_vertical = positive_horizontal & x_vertical
+    return distance
+
+
+def _levenshtein_banded(word1: str, word2: str, max_distance: int | None = None) -> int:
+    """
+    Dynamic programming Levenshtein distance: Only the diagonal band of +/- `max_distance` is calculated (Ukkonen)
+    and only two rows are allocated.
+    """
+    if len(word1) < len(word2):
+        word1, word2 = word2, word1
+    len1 = len(word1)
+    len2 = len(word2)
+
+    if max_distance is None:
+        max_distance = len1  # The distance can't be greater
+    else:
+        assert max_distance >= 0
+    cutoff = max_distance + 1
+    if len1 - len2 > max_distance:
+        return cutoff
+
+    if len2 == 0:
+        return len1
+
+    previous_row = array('I', [min(j, cutoff) for j in range(len2 + 1)])
+    current_row = array('I', previous_row)
+
+    for i, c1 in enumerate(word1, start=1):
+        start = max(1, i - max_distance)
+        end = min(len2, i + max_distance)
+
+        current_row[start - 1] = i if start == 1 and i < cutoff else cutoff
+        row_min = current_row[start - 1]
+        for j in range(start, end + 1):
+            value = previous_row[j - 1] + (c1 != word2[j - 1])  # substitution
+            if (insertion := previous_row[j] + 1) < value:
+                value = insertion
+            if (deletion := current_row[j - 1] + 1) < value:
+                value = deletion
+            if value > cutoff:
+                value = cutoff
+            current_row[j] = value
+            if value < row_min:
+                row_min = value
+        if end < len2:
+            current_row[end + 1] = cutoff  # Outside the band for the next row
 
-    for i, c1 in enumerate(word1):
-        current_row = [i + 1]
-        for j, c2 in enumerate(word2):
-            insertions = previous_row[j + 1] + 1
-            deletions = current_row[j] + 1
-            substitutions = previous_row[j] + (c1 != c2)
-            current_row.append(min(insertions, deletions, substitutions))
+        if row_min >= cutoff:
+            return cutoff  # All values in the band are too big -> stop early
 
-        previous_row = current_row
+        previous_row, current_row = current_row, previous_row
 
-    return previous_row[-1]
+    return previous_row[len2]
+
+
+NON_WORD_CHARS_RE = re.compile(r'[^\w\s-]')
 
 
 def get_words(text, min_word_length=0, ignore_words=(), to_lower=True):
@@ -54,7 +159,7 @@ def get_words(text, min_word_length=0, ignore_words=(), to_lower=True):
         text = text.lower()
     text = unicodedata.normalize('NFKC', text)
 
-    text = re.sub(r'[^\w\s-]', '', text).strip()
+    text = NON_WORD_CHARS_RE.sub('', text).strip()
     words = text.split(' ')
 
     if min_word_length > 0:
@@ -66,10 +171,68 @@ def get_words(text, min_word_length=0, ignore_words=(), to_lower=True):
     return words
 
 
-def compare_sentences(text1, text2, min_word_length=4, ignore_words=(), compare_lower=True) -> None | int:
+class WordTokenizer:
+    """
+    Same as get_words(), but the filters are prepared only once and the results
+    of the last `cache_size` texts are cached.
+
+    >>> tokenizer = WordTokenizer(min_word_length=2, ignore_words=('ab', 'efg'))
+    >>> tokenizer('A AB cd EfG hij')
+    ['cd', 'hij']
+    >>> tokenizer.tokenize_many(['One, two!', 'test Äöüß!'])
+    [['one', 'two'], ['test', 'äöüß']]
+    """
+
+    def __init__(self, min_word_length=0, ignore_words=(), to_lower=True, cache_size=10_000):
+        self.min_word_length = min_word_length
+        self.ignore_words = frozenset(ignore_words)
+        self.to_lower = to_lower
+        self.cache_size = cache_size
+        self._cached_tokenize = functools.lru_cache(maxsize=cache_size)(self._tokenize)
+
+    def __getstate__(self):
+        # The cache is bound to this instance and can't be pickled (e.g. for process pools)
+        state = self.__dict__.copy()
+        del state['_cached_tokenize']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._cached_tokenize = functools.lru_cache(maxsize=self.cache_size)(self._tokenize)
+
+    def _tokenize(self, text: str) -> tuple[str, ...]:
+        if self.to_lower:
+            text = text.lower()
+        text = unicodedata.normalize('NFKC', text)
+        words = NON_WORD_CHARS_RE.sub('', text).strip().split(' ')
+
+        min_word_length = self.min_word_length
+        ignore_words = self.ignore_words
+        if min_word_length > 0 or ignore_words:
+            words = [word for word in words if len(word) >= min_word_length and word not in ignore_words]
+        return tuple(words)
+
+    def __call__(self, text: str) -> list[str]:
+        return list(self._cached_tokenize(text))
+
+    def tokenize_many(self, texts: Iterable[str]) -> list[list[str]]:
+        cached_tokenize = self._cached_tokenize
+        return [list(cached_tokenize(text)) for text in texts]
+
+    def cache_info(self):
+        return self._cached_tokenize.cache_info()
+
+    def cache_clear(self) -> None:
+        self._cached_tokenize.cache_clear()
+
+
+def compare_sentences(
+    text1, text2, min_word_length=4, ignore_words=(), compare_lower=True, max_distance=None
+) -> None | int:
     """
     Calculates the Levenshtein distance between text1 and text2. With filter functionality.
     But split to words and ignore special characters.
+    Stops early if the distance is greater than `max_distance` (see: levenshtein_distance())
 
     >>> compare_sentences('planet', 'planetary')
     3
@@ -87,7 +250,124 @@ def compare_sentences(text1, text2, min_word_length=4, ignore_words=(), compare_
     if not text1 or not text2:
         return None
 
-    return levenshtein_distance(text1, text2)
+    return levenshtein_distance(text1, text2, max_distance=max_distance)
+
+
+class SentenceIndex:
+    """
+    One-to-many version of compare_sentences(): Find all texts within a Levenshtein distance.
+    The texts are normalized only once via get_words() and stored in a BK-tree, so a query doesn't
+    need to compare against all entries. Texts that are completely filtered out are not indexed.
+
+    >>> index = SentenceIndex()
+    >>> index.add_many(['The planet', 'Planetary', 'Container orchestration'])
+    >>> index.find('the planets!', max_distance=3)
+    [(0, 1), (1, 3)]
+    >>> index.find_near_duplicates(max_distance=3)
+    [(0, 1, 3)]
+    """
+
+    def __init__(self, min_word_length=4, ignore_words=(), compare_lower=True):
+        self.tokenizer = WordTokenizer(min_word_length, ignore_words, to_lower=compare_lower)
+        self.texts: list[str] = []
+        self.keys: list[str] = []  # The normalized texts
+        self.root = None  # BK-tree node: (key, [indices], {distance: child node})
+
+    def normalize(self, text: str) -> str:
+        return ' '.join(self.tokenizer(text))
+
+    def add(self, text: str) -> int:
+        index = len(self.texts)
+        key = self.normalize(text)
+        self.texts.append(text)
+        self.keys.append(key)
+        if key:
+            self._insert(key, index)
+        return index
+
+    def add_many(self, texts: Iterable[str]) -> None:
+        for text in texts:
+            self.add(text)
+
+    def _insert(self, key: str, index: int) -> None:
+        if self.root is None:
+            self.root = (key, [index], {})
+            return
+
+        node = self.root
+        while True:
+            distance = levenshtein_distance(key, node[0])
+            if distance == 0:
+                node[1].append(index)
+                return
+            children = node[2]
+            if distance not in children:
+                children[distance] = (key, [index], {})
+                return
+            node = children[distance]
+
+    def _search(self, key: str, max_distance: int) -> Iterator[tuple[int, int]]:
+        stack = [self.root] if self.root else []
+        while stack:
+            node_key, indices, children = stack.pop()
+            distance = levenshtein_distance(key, node_key)
+            if distance <= max_distance:
+                for index in indices:
+                    yield index, distance
+            # Triangle inequality: Only these children can contain matches
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+
+    def find(self, text: str, max_distance: int) -> list[tuple[int, int]]:
+        """
+        Returns (index, distance) tuples of all texts within `max_distance`, sorted by distance.
+        """
+        key = self.normalize(text)
+        if not key:
+            return []
+        return sorted(self._search(key, max_distance), key=lambda item: (item[1], item[0]))
+
+    def _near_duplicates(self, indices: Iterable[int], max_distance: int) -> list[tuple[int, int, int]]:
+        result: list[tuple[int, int, int]] = []
+        for index in indices:
+            if key := self.keys[index]:
+                result.extend(
+                    (index, other_index, distance)
+                    for other_index, distance in self._search(key, max_distance)
+                    if other_index > index
+                )
+        return result
+
+    def find_near_duplicates(self, max_distance: int, workers: int | None = None) -> list[tuple[int, int, int]]:
+        """
+        Returns sorted (index1, index2, distance) tuples of all text pairs within `max_distance`.
+        With `workers` the queries run in a process pool.
+        """
+        if not workers:
+            return sorted(self._near_duplicates(range(len(self.texts)), max_distance))
+
+        chunks = [range(start, min(start + 1000, len(self.texts))) for start in range(0, len(self.texts), 1000)]
+        result = []
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_sentence_index_worker, initargs=(self,)
+        ) as executor:
+            for chunk_result in executor.map(_near_duplicates_worker, chunks, [max_distance] * len(chunks)):
+                result.extend(chunk_result)
+        return sorted(result)
+
+
+_worker_sentence_index: SentenceIndex | None = None
+
+
+def _init_sentence_index_worker(sentence_index: SentenceIndex) -> None:
+    global _worker_sentence_index
+    _worker_sentence_index = sentence_index
+
+
+def _near_duplicates_worker(indices: range, max_distance: int) -> list[tuple[int, int, int]]:
+    assert _worker_sentence_index is not None
+    return _worker_sentence_index._near_duplicates(indices, max_distance)
 
 
 def uuid_from_text(text: str) -> UUID:
@@ -103,6 +383,40 @@ def uuid_from_text(text: str) -> UUID:
     return uuid
 
 
+@functools.lru_cache(maxsize=4096)
+def cached_uuid_from_text(text: str) -> UUID:
+    """
+    Same as uuid_from_text(), but memorize the results in a bounded LRU cache.
+    Use `cached_uuid_from_text.cache_info()` for hit/miss counters and `cached_uuid_from_text.cache_clear()`
+
+    >>> cached_uuid_from_text('foo')
+    UUID('0808f64e-60d5-8979-fcb6-76c96ec93827')
+    """
+    return uuid_from_text(text)
+
+
+# Matches the common UUID notations. Everything else is checked by UUID() itself:
+UUID_RE = re.compile(
+    r'(?:urn:uuid:)?\{?'
+    r'[0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{12}'
+    r'\}?'
+)
+
+
+def _is_uuid(text: str, fullmatch=UUID_RE.fullmatch) -> bool:
+    if fullmatch(text):
+        return True
+    if len(text) < 32:
+        # UUID() only removes characters, so it needs at least 32 characters
+        return False
+    try:
+        UUID(text)
+    except ValueError:
+        return False
+    else:
+        return True
+
+
 def is_uuid(text: str) -> bool:
     """
     Returns True if text is a valid UUID (https://www.rfc-editor.org/rfc/rfc9562#name-uuid-format).
@@ -119,13 +433,46 @@ def is_uuid(text: str) -> bool:
     False
     """
     assert isinstance(text, str)
+    return _is_uuid(text)
 
-    try:
-        UUID(text)
-    except ValueError:
-        return False
-    else:
-        return True
+
+def are_uuids(texts: Iterable[str]) -> bytearray:
+    """
+    Validate many UUIDs at once, same rules as is_uuid().
+    Returns one byte per text: 1 if valid, 0 if not.
+
+    >>> flags = are_uuids(['0808f64e-60d5-8979-fcb6-76c96ec93827', 'foo', '{0808f64e60d58979fcb676c96ec93827}'])
+    >>> list(flags)
+    [1, 0, 1]
+    >>> all(flags)
+    False
+    """
+    return bytearray(map(_is_uuid, texts))
+
+
+def invalid_uuid_indices(texts: Iterable[str]) -> list[int]:
+    """
+    Returns the indices of all texts that are not valid UUIDs, same rules as is_uuid().
+
+    >>> invalid_uuid_indices(['0808f64e-60d5-8979-fcb6-76c96ec93827', 'foo', '',
+    ...  'urn:uuid:0808f64e60d58979fcb676c96ec93827'])
+    [1, 2]
+    """
+    return [index for index, text in enumerate(texts) if not _is_uuid(text)]
+
+
+def parse_uuids(texts: Iterable[str]) -> list[UUID | None]:
+    """
+    Convert many texts to UUID instances. Invalid UUIDs will be None.
+
+    >>> parse_uuids(['0808f64e-60d5-8979-fcb6-76c96ec93827', 'foo'])
+    [UUID('0808f64e-60d5-8979-fcb6-76c96ec93827'), None]
+    """
+    result: list[UUID | None] = []
+    append = result.append
+    for text in texts:
+        append(UUID(text) if _is_uuid(text) else None)
+    return result
 
 
 def ensure_lf(text: str | None) -> str | None:
@@ -1,13 +1,95 @@
+import copy
 import inspect
+import random
+from collections import OrderedDict, defaultdict
 from collections.abc import Generator
 from unittest import TestCase
 
-from bx_py_utils.dict_utils import dict_list2markdown
+from bx_py_utils.dict_utils import (
+    DictDiffEntry,
+    compare_dict_values,
+    compile_getter,
+    compile_multi_getter,
+    dict_get,
+    dict_get_many,
+    dict_list2csv,
+    dict_list2html,
+    dict_list2markdown,
+    dict_prune_falsy,
+    iter_dict_diff,
+    pluck,
+    pluck_many,
+)
 
 
 class DictUtilsTestCase(TestCase):
-    def assert_dict_list2markdown(self, data, expected):
-        result = dict_list2markdown(data)
+    def test_compile_getter(self):
+        class DictSubclass(dict):  # noqa: FURB189
+            pass
+
+        items = [
+            {'a': {'b': {'c': {'d': {'e': 'E'}}}}},
+            {'a': {'b': {'c': {'d': 'no dict'}}}},
+            {'a': {'b': {'c': None}}},
+            {'a': {'b': ['list']}},
+            {'a': ['b']},
+            {'a': DictSubclass(b=DictSubclass(c='C'))},
+            {'a': 'no dict'},
+            {},
+            ['a'],
+            'a',
+            None,
+        ]
+        for keys in ((), ('a',), ('a', 'b'), ('a', 'b', 'c'), ('a', 'b', 'c', 'd'), ('a', 'b', 'c', 'd', 'e')):
+            with self.subTest(keys=keys):
+                getter = compile_getter(*keys)
+                expected = [dict_get(item, *keys) for item in items]
+                self.assertEqual([getter(item) for item in items], expected)
+                self.assertEqual(dict_get_many(items, *keys), expected)
+                self.assertEqual(dict_get_many(iter(items), *keys), expected)
+
+    def test_compile_multi_getter(self):
+        getter = compile_multi_getter(
+            {
+                'id': ('id',),
+                'name': ['user', 'name'],
+                'city': ('user', 'address', 'city'),
+                'item': (),
+            }
+        )
+        item = {'id': 1, 'user': {'name': 'Joe', 'address': {'city': 'Berlin'}}}
+        self.assertEqual(getter(item), {'id': 1, 'name': 'Joe', 'city': 'Berlin', 'item': item})
+        self.assertEqual(getter('no dict'), {'id': None, 'name': None, 'city': None, 'item': 'no dict'})
+        self.assertEqual(compile_multi_getter({})(item), {})
+
+    def test_pluck_many(self):
+        records = [
+            {'a': 1, 'b': 2, 'c': 3},
+            {'a': 4, 'c': 6},
+            {'c': 9},
+            {},
+        ]
+        keys = ['b', 'a']
+        expected = [pluck(record, keys) for record in records]
+        self.assertEqual(pluck_many(records, keys), expected)
+        self.assertEqual(pluck_many(iter(records), iter(keys)), expected)
+        self.assertEqual(pluck_many(records, ['a', 'a']), [{'a': 1}, {'a': 4}, {}, {}])
+
+        self.assertEqual(
+            pluck_many(records, keys, as_columns=True),
+            {'b': [2, None, None, None], 'a': [1, 4, None, None]},
+        )
+        self.assertEqual(
+            pluck_many((record for record in records), ['c'], as_columns=True),
+            {'c': [3, 6, 9, None]},
+        )
+
+        self.assertEqual(pluck_many([], keys), [])
+        self.assertEqual(pluck_many([], keys, as_columns=True), {'b': [], 'a': []})
+        self.assertEqual(pluck_many(records, [], as_columns=True), {})
+
+    def assert_dict_list2markdown(self, data, expected, **kwargs):
+        result = dict_list2markdown(data, **kwargs)
         self.assertIsInstance(result, Generator)
         markdown = '\n'.join(result)
         expected = inspect.cleandoc(expected)
@@ -76,3 +158,265 @@ class DictUtilsTestCase(TestCase):
                 | 1 | A1 |
             """,
         )
+
+    def test_dict_list2markdown_aligned(self):
+        self.assert_dict_list2markdown(
+            data=[
+                {'a': 'A1', 'Pipe|Key': 'Foo|Bar'},
+                {'a': 'Multi\nLine', 'Pipe|Key': None},
+                {'a': 12345678, 'Pipe|Key': ''},
+            ],
+            expected=r"""
+                | index | a             | Pipe\|Key |
+                | ----- | ------------- | --------- |
+                | 1     | A1            | Foo\|Bar  |
+                | 2     | Multi<br>Line | None      |
+                | 3     | 12345678      |           |
+            """,
+            aligned=True,
+        )
+
+        # Generator is created, but is empty:
+        for aligned in (False, True):
+            self.assertEqual(list(dict_list2markdown([], aligned=aligned)), [])
+            with self.assertRaisesRegex(AssertionError, 'Entry 2 has different keys'):
+                list(dict_list2markdown([{'a': 1}, {'b': 2}], aligned=aligned))
+
+    def test_dict_list2csv(self):
+        data = [
+            {'a': 'A1', 'b': 'Comma, Value'},
+            {'a': 'Multi\nLine', 'b': None},
+        ]
+        result = dict_list2csv(data)
+        self.assertIsInstance(result, Generator)
+        self.assertEqual(list(result), ['a,b\r\n', 'A1,"Comma, Value"\r\n', '"Multi\nLine",\r\n'])
+        self.assertEqual(
+            ''.join(dict_list2csv(data, with_index=True, delimiter=';', lineterminator='\n')),
+            'index;a;b\n1;A1;Comma, Value\n2;"Multi\nLine";\n',
+        )
+        self.assertEqual(list(dict_list2csv([])), [])
+
+    def test_dict_list2html(self):
+        result = dict_list2html([{'a': 'A1', '<b>': 'Foo & Bar'}, {'a': 'Multi\r\nLine', '<b>': None}])
+        self.assertIsInstance(result, Generator)
+        self.assertEqual(
+            list(result),
+            [
+                '<table>',
+                '<thead><tr><th>index</th><th>a</th><th>&lt;b&gt;</th></tr></thead>',
+                '<tbody>',
+                '<tr><td>1</td><td>A1</td><td>Foo &amp; Bar</td></tr>',
+                '<tr><td>2</td><td>Multi<br>Line</td><td>None</td></tr>',
+                '</tbody>',
+                '</table>',
+            ],
+        )
+        self.assertEqual(
+            list(dict_list2html([{'a': 1}], with_index=False)),
+            ['<table>', '<thead><tr><th>a</th></tr></thead>', '<tbody>', '<tr><td>1</td></tr>', '</tbody>', '</table>'],
+        )
+        self.assertEqual(list(dict_list2html([])), [])
+
+    def test_iter_dict_diff(self):
+        current = {
+            'same': {'list': [1, 2, {'a': 'A'}]},
+            'changed': {'int': 1, 'bool': 1, 'list': [1, 2], 'tuple': (1, 2), 'type': [1]},
+            'only/current': 1,
+            'ti~lde': None,
+        }
+        expected = {
+            'same': {'list': [1, 2, {'a': 'A'}]},
+            'changed': {'int': 2, 'bool': True, 'list': [1, 2, 3], 'tuple': (1, 3, 4), 'type': (1,)},
+            'only_expected': {'nested': 1},
+            'ti~lde': 0,
+        }
+        self.assertEqual(
+            [(entry.kind, entry.path, entry.expected, entry.current) for entry in iter_dict_diff(current, expected)],
+            [
+                ('changed', '/changed/int', 2, 1),
+                ('changed', '/changed/bool', True, 1),
+                ('removed', '/changed/list/2', 3, None),
+                ('changed', '/changed/tuple/1', 3, 2),
+                ('removed', '/changed/tuple/2', 4, None),
+                ('changed', '/changed/type', (1,), [1]),
+                ('added', '/only~1current', None, 1),
+                ('changed', '/ti~0lde', 0, None),
+                ('removed', '/only_expected', {'nested': 1}, None),
+            ],
+        )
+        self.assertEqual(
+            list(iter_dict_diff(current, expected, max_diffs=1)),
+            [DictDiffEntry(kind='changed', keys=('changed', 'int'), expected=2, current=1)],
+        )
+        self.assertEqual(len(list(iter_dict_diff(current, expected, max_diffs=100))), 9)
+        self.assertEqual(
+            [entry.path for entry in iter_dict_diff(current, expected, strict_types=False)],
+            [
+                '/changed/int',
+                '/changed/list/2',
+                '/changed/tuple/1',
+                '/changed/tuple/2',
+                '/changed/type',
+                '/only~1current',
+                '/ti~0lde',
+                '/only_expected',
+            ],
+        )
+        self.assertEqual(
+            [entry.path for entry in iter_dict_diff(current, expected, max_depth=0)],
+            [''],
+        )
+        self.assertEqual(list(iter_dict_diff(current, current)), [])
+        self.assertEqual(list(iter_dict_diff(1, 1)), [])
+        self.assertEqual(list(iter_dict_diff(1, 1.0)), [DictDiffEntry('changed', (), 1.0, 1)])
+        self.assertEqual(list(iter_dict_diff(1, 1.0, strict_types=False)), [])
+
+        # Deep nesting doesn't hit the recursion limit:
+        current = expected = 'leaf'
+        for _ in range(5000):
+            current = {'x': [current]}
+            expected = {'x': [expected]}
+        (entry,) = iter_dict_diff({'x': [current]}, {'x': [expected, 'new']})
+        self.assertEqual(entry.kind, 'removed')
+        self.assertEqual(entry.path, '/x/1')
+
+    def test_compare_dict_values_summary(self):
+        def compare_dict_values_reference(dict1, dict2):
+            # The top-level only implementation before iter_dict_diff() was added:
+            result = {'correct_keys': {}, 'wrong_keys': {}, 'skipped_keys': {}}
+            for key in sorted(dict1.keys() | dict2.keys()):
+                expected_value = dict2.get(key)
+                current_value = dict1.get(key)
+                if key not in dict1 or key not in dict2:
+                    result['skipped_keys'][key] = {'expected': expected_value, 'current': current_value}
+                elif type(expected_value) == type(current_value) and expected_value == current_value:  # noqa: E721
+                    result['correct_keys'][key] = expected_value
+                else:
+                    result['wrong_keys'][key] = {'expected': expected_value, 'current': current_value}
+            return result
+
+        nan = float('nan')
+        values = [0, 1, 1.0, True, False, None, '', 'a', [], [1], [True], (1,), {}, {'x': 1}, {'x': True}, nan]
+        rng = random.Random(42)
+        for _ in range(500):
+            dict1 = {key: rng.choice(values) for key in rng.sample('abcdef', rng.randint(0, 6))}
+            dict2 = {key: rng.choice(values) for key in rng.sample('abcdef', rng.randint(0, 6))}
+            result = compare_dict_values(dict1, dict2)
+            expected = compare_dict_values_reference(dict1, dict2)
+            self.assertEqual(
+                (result.correct_keys, result.wrong_keys, result.skipped_keys),
+                (expected['correct_keys'], expected['wrong_keys'], expected['skipped_keys']),
+            )
+            self.assertEqual(list(result.correct_keys), list(expected['correct_keys']))
+
+        # dict subclasses on one or both sides:
+        for dict1, dict2 in (
+            (OrderedDict(a=1, b=2), {'a': 2, 'b': 2}),
+            (defaultdict(int, a=1), {'a': 1, 'c': 0}),
+            ({'a': 1, 'b': True}, OrderedDict(a=1, b=1)),
+            (OrderedDict(a={'x': 1}), defaultdict(int, a={'x': 1})),
+            ({'a': nan, 'b': float('nan')}, {'a': nan, 'b': 1.0}),  # NaN is never equal, not even to itself
+        ):
+            with self.subTest(dict1=dict1, dict2=dict2):
+                result = compare_dict_values(dict1, dict2)
+                expected = compare_dict_values_reference(dict1, dict2)
+                self.assertEqual(
+                    (result.correct_keys, result.wrong_keys, result.skipped_keys),
+                    (expected['correct_keys'], expected['wrong_keys'], expected['skipped_keys']),
+                )
+        self.assertEqual(list(compare_dict_values({'a': nan}, {'a': nan}).wrong_keys), ['a'])
+
+    def test_dict_prune_falsy(self):
+        def dict_prune_falsy_reference(obj):
+            # The recursive implementation before "in_place" was added:
+            if isinstance(obj, dict):
+                return {k: v for k in obj if (v := dict_prune_falsy_reference(obj[k]))}
+            if isinstance(obj, list):
+                return [dict_prune_falsy_reference(item) if isinstance(item, dict) else item for item in obj]
+            if isinstance(obj, tuple):
+                return tuple(dict_prune_falsy_reference(item) if isinstance(item, dict) else item for item in obj)
+            return obj
+
+        rng = random.Random(42)
+
+        def make_data(depth):
+            # Lists/tuples contain only scalars and dicts here, because the reference implementation
+            # didn't prune dicts in lists of lists.
+            scalars = [0, 1, '', 'x', None, False, True, [], {}, ()]
+            if depth <= 0:
+                return rng.choice(scalars)
+            kind = rng.choice(('dict', 'dict', 'list', 'tuple', 'scalar'))
+            if kind == 'dict':
+                return {f'k{i}': make_data(depth - 1) for i in range(rng.randint(0, 4))}
+            if kind == 'scalar':
+                return rng.choice(scalars)
+            items = [make_data(depth - 2) if rng.random() < 0.5 else rng.choice(scalars) for _ in range(3)]
+            items = [item if isinstance(item, dict) or not isinstance(item, (list, tuple)) else 0 for item in items]
+            return items if kind == 'list' else tuple(items)
+
+        for _ in range(300):
+            data = make_data(5)
+            expected = dict_prune_falsy_reference(data)
+            original = copy.deepcopy(data)
+
+            self.assertEqual(dict_prune_falsy(data), expected)
+            self.assertEqual(data, original)  # Not modified
+
+            result = dict_prune_falsy(data, in_place=True)
+            self.assertEqual(result, expected)
+            if isinstance(data, (dict, list)):
+                self.assertIs(result, data)
+
+        self.assertEqual(dict_prune_falsy(0), 0)
+        self.assertEqual(dict_prune_falsy({}), {})
+        self.assertEqual(dict_prune_falsy(()), ())
+
+    def test_dict_prune_falsy_nested(self):
+        data = {'list': [[{'a': 0, 'b': 1}], ([{'c': None}],)], 'tuple': ({'d': ''},), 'empty': ({'e': None},)}
+        self.assertEqual(
+            dict_prune_falsy(data),
+            {'list': [[{'b': 1}], ([{}],)], 'tuple': ({},), 'empty': ({},)},
+        )
+        self.assertEqual(
+            dict_prune_falsy(data, is_falsy=lambda value: value is None),
+            {'list': [[{'a': 0, 'b': 1}], ([{}],)], 'tuple': ({'d': ''},), 'empty': ({},)},
+        )
+
+        data = {'a': {'b': [{'c': 0, 'd': 'ok'}], 'e': ({'f': None},)}}
+        inner_list = data['a']['b']
+        result = dict_prune_falsy(data, in_place=True)
+        self.assertIs(result, data)
+        self.assertIs(result['a']['b'], inner_list)
+        self.assertEqual(result, {'a': {'b': [{'d': 'ok'}], 'e': ({},)}})
+
+        # Deep nesting doesn't hit the recursion limit:
+        data = leaf = {'value': 1, 'empty': None}
+        for _ in range(5000):
+            data = {'x': [data], 'y': 0}
+        for in_place in (False, True):
+            result = dict_prune_falsy(data, in_place=in_place)
+            for _ in range(5000):
+                self.assertEqual(result.keys(), {'x'})
+                (result,) = result['x']
+            self.assertEqual(result, {'value': 1})
+        self.assertIs(result, leaf)
+
+    def test_dict_prune_falsy_circular(self):
+        data = {}
+        data['self'] = data
+        with self.assertRaisesRegex(ValueError, "Circular reference detected at key 'self'"):
+            dict_prune_falsy(data)
+
+        data = {'a': [0, {'b': None}]}
+        data['a'][1]['parent'] = ({'x': data['a']},)  # Cycle via a tuple
+        for in_place in (False, True):
+            with self.subTest(in_place=in_place), self.assertRaisesRegex(ValueError, "at key 'x'"):
+                dict_prune_falsy(data, in_place=in_place)
+
+        # The same object on different branches is not a cycle:
+        shared = {'a': 0, 'b': 1}
+        data = {'x': shared, 'y': [shared, (shared,)]}
+        self.assertEqual(dict_prune_falsy(data), {'x': {'b': 1}, 'y': [{'b': 1}, ({'b': 1},)]})
+        self.assertEqual(shared, {'a': 0, 'b': 1})
+        self.assertIs(dict_prune_falsy(data, in_place=True), data)
+        self.assertEqual(shared, {'b': 1})
@@ -1,18 +1,39 @@
+import asyncio
 import io
+import os
+import tempfile
+import time
 from pathlib import Path
-from unittest import TestCase
+from unittest import IsolatedAsyncioTestCase, TestCase, skipIf
+from unittest.mock import patch
 
+from bx_py_utils.dict_utils import DictCompareResult
 from bx_py_utils.file_utils import (
+    AsyncTempFileHasher,
     EmptyFileError,
+    FileHashCache,
     FileHasher,
+    FilenameSanitizer,
     FileSizeError,
     NamedTemporaryFile2,
     OverlongFilenameError,
+    ParallelFileHasher,
+    SpooledTemporaryFile2,
     TempFileHasher,
+    _hash_tree_file,
     cut_filename,
     get_and_assert_file_size,
+    hash_file,
+    hash_tree,
     safe_filename,
 )
+from bx_py_utils.hash_utils import compare_hashes
+
+
+def get_cpu_count() -> int:
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))  # Respects CPU pinning, e.g. in containers
+    return os.cpu_count() or 1
 
 
 class TempFileUtilsTestCase(TestCase):
@@ -81,6 +102,254 @@ class TempFileUtilsTestCase(TestCase):
         msg = str(err.exception)
         assert msg == 'unsupported hash type Bam!'
 
+    def test_hash_file(self):
+        with NamedTemporaryFile2(file_name='file.ext') as temp:
+            path = Path(temp.file_object.name)
+
+            for use_mmap in (False, True):
+                file_hasher = hash_file(path, use_mmap=use_mmap)
+                assert file_hasher.bytes_processed == 0
+                assert file_hasher.hexdigest_dict()['md5'] == 'd41d8cd98f00b204e9800998ecf8427e'
+
+            temp.file_object.write(b'123')
+            temp.file_object.flush()
+            for use_mmap in (False, True):
+                file_hasher = hash_file(str(path), chunk_size=2, use_mmap=use_mmap)
+                assert file_hasher.bytes_processed == 3
+                assert file_hasher.hexdigest_dict() == {
+                    'md5': '202cb962ac59075b964b07152d234b70',
+                    'sha1': '40bd001563085fc35165329ea1ff5c5ecbdbbeef',
+                    'sha3_224': '602bdc204140db016bee5374895e5568ce422fabe17e064061d80097',
+                }
+
+            content = os.urandom(10_000)
+            temp.file_object.seek(0)
+            temp.file_object.write(content)
+            temp.file_object.flush()
+            with FileHasher(hash_names=('sha256',)) as expected_hasher:
+                expected_hasher(content)
+            for chunk_size in (1000, 1024, 20_000):
+                for use_mmap in (False, True):
+                    file_hasher = hash_file(path, hash_names=('sha256',), chunk_size=chunk_size, use_mmap=use_mmap)
+                    assert file_hasher.bytes_processed == 10_000
+                    assert file_hasher.hexdigest_dict() == expected_hasher.hexdigest_dict()
+
+    def test_hash_tree(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+            (temp_path / 'sub' / 'dir').mkdir(parents=True)
+            (temp_path / 'a.txt').write_bytes(b'123')
+            (temp_path / 'b.bin').write_bytes(b'not matched')
+            (temp_path / 'sub' / 'c.txt').write_bytes(b'')
+            (temp_path / 'sub' / 'dir' / 'd.txt').write_bytes(b'123')
+
+            for use_processes in (False, True):
+                results = hash_tree(temp_path, patterns=('*.txt',), workers=2, use_processes=use_processes)
+                results = sorted(results, key=lambda result: result['path'])
+                self.assertEqual(
+                    [(result['path'].relative_to(temp_path).as_posix(), result['file_size']) for result in results],
+                    [('a.txt', 3), ('sub/c.txt', 0), ('sub/dir/d.txt', 3)],
+                )
+                self.assertEqual(
+                    results[0],
+                    {
+                        'path': temp_path / 'a.txt',
+                        'file_size': 3,
+                        'md5': '202cb962ac59075b964b07152d234b70',
+                        'sha1': '40bd001563085fc35165329ea1ff5c5ecbdbbeef',
+                        'sha3_224': '602bdc204140db016bee5374895e5568ce422fabe17e064061d80097',
+                    },
+                )
+
+            # Usable with compare_hashes():
+            results = sorted(hash_tree(temp_dir, hash_names=('md5',), workers=1), key=lambda result: result['path'])
+            self.assertEqual(len(results), 4)
+            self.assertEqual(
+                compare_hashes(results[0], {'md5': '202cb962ac59075b964b07152d234b70', 'file_size': 3}, ('file_size',)),
+                DictCompareResult(
+                    correct_keys={'md5': '202cb962ac59075b964b07152d234b70', 'file_size': 3},
+                    wrong_keys={},
+                    skipped_keys={},
+                ),
+            )
+
+            with self.assertRaises(ValueError) as err:
+                list(hash_tree(temp_path, hash_names=('Bam!',)))
+            self.assertEqual(str(err.exception), 'unsupported hash type Bam!')
+
+    def test_hash_tree_errors(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+            (temp_path / 'a.txt').write_bytes(b'123')
+            (temp_path / 'b.txt').symlink_to(temp_path / 'does-not-exist.txt')
+            (temp_path / 'c.txt').write_bytes(b'456')
+
+            with FileHashCache(temp_path / 'cache.sqlite') as cache:
+                for kwargs in ({}, {'use_processes': True}, {'cache': cache}):
+                    with self.subTest(**kwargs):
+                        results = hash_tree(temp_path, patterns=('*.txt',), hash_names=('md5',), **kwargs)
+                        results = sorted(results, key=lambda result: result['path'])
+                        self.assertEqual(
+                            [sorted(result.keys()) for result in results],
+                            [['file_size', 'md5', 'path'], ['error', 'path'], ['file_size', 'md5', 'path']],
+                        )
+                        error_result = results[1]
+                        self.assertEqual(error_result['path'], temp_path / 'b.txt')
+                        self.assertIsInstance(error_result['error'], FileNotFoundError)
+
+                # Errors are not cached:
+                cached_paths = [Path(row[0]).name for row in cache.connection.execute('SELECT path FROM file_hashes')]
+                self.assertEqual(sorted(cached_paths), ['a.txt', 'c.txt'])
+
+    def test_file_hash_cache(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+            file_path = temp_path / 'file.txt'
+            file_path.write_bytes(b'123')
+            expected = {
+                'file_size': 3,
+                'md5': '202cb962ac59075b964b07152d234b70',
+                'sha1': '40bd001563085fc35165329ea1ff5c5ecbdbbeef',
+                'sha3_224': '602bdc204140db016bee5374895e5568ce422fabe17e064061d80097',
+            }
+
+            with FileHashCache(temp_path / 'cache.sqlite') as cache, patch(
+                'bx_py_utils.file_utils.hash_file', wraps=hash_file
+            ) as hash_file_mock:
+                self.assertIsNone(cache.get(file_path))
+                self.assertEqual(cache.hash_file(file_path), expected)
+                self.assertEqual(hash_file_mock.call_count, 1)
+
+                # Unchanged file -> no hashing:
+                self.assertEqual(cache.get(file_path), expected)
+                self.assertEqual(cache.hash_file(file_path), expected)
+                self.assertEqual(
+                    cache.hash_file(file_path, hash_names=('md5',)),
+                    {'file_size': 3, 'md5': expected['md5']},
+                )
+                self.assertEqual(hash_file_mock.call_count, 1)
+
+                # Other hash algorithms -> hashing:
+                self.assertEqual(cache.hash_file(file_path, hash_names=('md5', 'sha256'))['file_size'], 3)
+                self.assertEqual(hash_file_mock.call_count, 2)
+
+                # Force hashing via verify:
+                self.assertEqual(cache.hash_file(file_path, verify=True), expected)
+                self.assertEqual(hash_file_mock.call_count, 3)
+
+                # Changed file -> hashing:
+                file_path.write_bytes(b'1234')
+                self.assertIsNone(cache.get(file_path))
+                self.assertEqual(cache.hash_file(file_path)['md5'], '81dc9bdb52d04dc20036dbd8313ed055')
+                self.assertEqual(hash_file_mock.call_count, 4)
+
+                cache.invalidate(file_path)
+                self.assertIsNone(cache.get(file_path))
+
+            # The cache is persistent:
+            with FileHashCache(temp_path / 'cache.sqlite') as cache:
+                self.assertIsNone(cache.get(file_path))  # invalidated
+                cache.hash_file(file_path)
+            with FileHashCache(temp_path / 'cache.sqlite') as cache:
+                self.assertEqual(cache.get(file_path)['file_size'], 4)
+
+                # Evict entries of removed files and the oldest entries:
+                for name in ('a', 'b', 'c'):
+                    (temp_path / name).write_bytes(name.encode())
+                    cache.hash_file(temp_path / name)
+                (temp_path / 'a').unlink()
+                self.assertEqual(cache.evict(), 1)
+                self.assertEqual(cache.evict(max_entries=1), 2)
+                self.assertEqual(cache.get(temp_path / 'c')['file_size'], 1)
+                self.assertIsNone(cache.get(file_path))
+                self.assertIsNone(cache.get(temp_path / 'b'))
+
+                cache.clear()
+                self.assertIsNone(cache.get(temp_path / 'c'))
+
+    def test_hash_tree_with_cache(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+            (temp_path / 'a.txt').write_bytes(b'123')
+            (temp_path / 'b.txt').write_bytes(b'456')
+
+            with FileHashCache(temp_path / 'cache.sqlite') as cache, patch(
+                'bx_py_utils.file_utils._hash_tree_file', wraps=_hash_tree_file
+            ) as hash_mock:
+                results1 = sorted(hash_tree(temp_path, patterns=('*.txt',), cache=cache), key=lambda r: r['path'])
+                self.assertEqual(hash_mock.call_count, 2)
+
+                results2 = sorted(hash_tree(temp_path, patterns=('*.txt',), cache=cache), key=lambda r: r['path'])
+                self.assertEqual(hash_mock.call_count, 2)  # All from cache
+                self.assertEqual(results1, results2)
+
+                (temp_path / 'b.txt').write_bytes(b'changed')
+                results3 = sorted(hash_tree(temp_path, patterns=('*.txt',), cache=cache), key=lambda r: r['path'])
+                self.assertEqual(hash_mock.call_count, 3)
+                self.assertEqual(results3[0], results1[0])
+                self.assertEqual(results3[1]['file_size'], 7)
+
+                list(hash_tree(temp_path, patterns=('*.txt',), cache=cache, verify=True))
+                self.assertEqual(hash_mock.call_count, 5)
+
+    def test_parallel_file_hasher(self):
+        with ParallelFileHasher() as file_hasher:
+            assert file_hasher.bytes_processed == 0
+            file_hasher(b'12')
+            file_hasher(bytearray(b'3'))
+            assert file_hasher.bytes_processed == 3
+            assert file_hasher.hexdigest_dict() == {
+                'md5': '202cb962ac59075b964b07152d234b70',
+                'sha1': '40bd001563085fc35165329ea1ff5c5ecbdbbeef',
+                'sha3_224': '602bdc204140db016bee5374895e5568ce422fabe17e064061d80097',
+            }
+        assert file_hasher.bytes_processed == 3
+        assert file_hasher.threads == []
+
+        # Same result as the FileHasher:
+        hash_names = ('md5', 'sha256', 'sha512', 'blake2b')
+        with ParallelFileHasher(hash_names=hash_names, max_queue_size=1) as parallel_hasher:
+            with FileHasher(hash_names=hash_names) as file_hasher:
+                buffer = bytearray(1000)
+                for _ in range(50):
+                    buffer[:] = os.urandom(1000)
+                    parallel_hasher(buffer)
+                    file_hasher(buffer)
+        assert parallel_hasher.bytes_processed == file_hasher.bytes_processed == 50_000
+        assert parallel_hasher.hexdigest_dict() == file_hasher.hexdigest_dict()
+
+    @skipIf(get_cpu_count() < 2, 'Parallel hashing needs more than one CPU core')
+    def test_parallel_file_hasher_speedup(self):
+        hash_names = ('sha256', 'sha512', 'sha3_512', 'blake2b')
+        chunks = [os.urandom(1024 * 1024)] * 32  # bytes -> no copies in ParallelFileHasher
+
+        def get_duration(hasher_class):
+            durations = []
+            for _ in range(3):
+                start = time.perf_counter()
+                with hasher_class(hash_names=hash_names) as hasher:
+                    for chunk in chunks:
+                        hasher(chunk)
+                    hasher.hexdigest_dict()
+                durations.append(time.perf_counter() - start)
+            return min(durations)
+
+        sequential_duration = get_duration(FileHasher)
+        parallel_duration = get_duration(ParallelFileHasher)
+        self.assertLess(
+            parallel_duration,
+            sequential_duration,
+            f'ParallelFileHasher {parallel_duration:.3f}s is not faster than FileHasher {sequential_duration:.3f}s',
+        )
+
+        with self.assertRaises(AssertionError) as err:
+            ParallelFileHasher()(b'123')
+        self.assertEqual(str(err.exception), 'ParallelFileHasher must be used as context manager!')
+
+        with self.assertRaises(ValueError) as err:
+            ParallelFileHasher(hash_names=('Bam!',))
+        self.assertEqual(str(err.exception), 'unsupported hash type Bam!')
+
     def test_temp_file_hasher(self):
         with TempFileHasher(file_name='foo.bar', expected_files_size=3) as tfh:
             tfh.write(b'123')
@@ -141,6 +410,126 @@ class TempFileUtilsTestCase(TestCase):
         msg = str(size_err.exception)
         assert msg == "File 'foo.bar' is 9 Bytes in size, but should be 99 Bytes!"
 
+    def test_filename_sanitizer(self):
+        file_names = [
+            '<XSS>"\' ättémpt-er😈 #1|/(\r\n2){}\t[].svg',
+            '1234567890_this_is_a_very_very_long_file_name_01234567890.wav',
+            '1234567890_foobar.ext1.ext2',
+            '.bashrc',
+            'no_suffix.',
+            'short.txt',
+        ]
+        for max_length in (None, 61, 20, 15):
+            sanitizer = FilenameSanitizer(max_length=max_length)
+            expected = [safe_filename(file_name) for file_name in file_names]
+            if max_length:
+                expected = [cut_filename(file_name, max_length=max_length) for file_name in expected]
+            self.assertEqual([sanitizer.sanitize(file_name) for file_name in file_names], expected)
+            self.assertEqual(sanitizer.sanitize_many(file_names), expected)  # No collisions
+
+        # Collisions get a deterministic hash suffix:
+        sanitizer = FilenameSanitizer(max_length=14)
+        self.assertEqual(
+            sanitizer.sanitize_many(['a<1>.txt', 'a>1<.txt', 'a_1_.txt', 'a_1_.txt', 'a_1_.txt']),
+            ['a_1_.txt', 'a_1__VBe.txt', 'a_1__9me.txt', 'a_1__sZZ.txt', 'a_1__vZ8.txt'],
+        )
+        self.assertEqual(
+            sanitizer.sanitize_many(['long_name_1.txt', 'long_name_2.txt']),
+            ['long_name_.txt', 'long_n_Wen.txt'],
+        )
+        self.assertEqual(
+            FilenameSanitizer(hash_length=8).sanitize_many(['a', 'a']),
+            ['a', 'a_RdTjJ0rh'],
+        )
+
+        # The hash suffix contains only letters and digits, so it never looks like a file extension:
+        file_names = FilenameSanitizer().sanitize_many(['README'] * 200)
+        self.assertEqual(len(set(file_names)), 200)
+        for file_name in file_names[1:]:
+            self.assertRegex(file_name, r'^README_[a-zA-Z0-9]{3}$')
+
+        # Names that differ only in case collide on case-insensitive file systems:
+        self.assertEqual(
+            FilenameSanitizer().sanitize_many(['Readme.txt', 'README.txt', 'readme.TXT']),
+            ['Readme.txt', 'README_VfG.txt', 'readme_S9D.TXT'],
+        )
+        self.assertEqual(
+            FilenameSanitizer(case_sensitive=True).sanitize_many(['Readme.txt', 'README.txt', 'readme.TXT']),
+            ['Readme.txt', 'README.txt', 'readme.TXT'],
+        )
+        # ...this includes the mixed case hash suffixes:
+        file_names = FilenameSanitizer(hash_length=1).sanitize_many(['a'] * 30)
+        self.assertEqual(len({file_name.casefold() for file_name in file_names}), 30)
+
+        with self.assertRaises(OverlongFilenameError) as err:
+            FilenameSanitizer(max_length=5).sanitize_many(['a.txt', 'a.txt'])
+        self.assertEqual(str(err.exception), "File name 'a.txt' can not be shortened to 1 characters.")
+
+    def test_spooled_temporary_file(self):
+        with SpooledTemporaryFile2(file_name='file.ext', max_memory_size=5) as spooled:
+            assert isinstance(spooled.file_object, io.BytesIO)
+            spooled.file_object.write(b'12345')
+            spooled.maybe_rollover()
+            self.assertIs(spooled.rolled_over, False)
+
+            spooled.file_object.write(b'6')
+            spooled.file_object.seek(2)
+            spooled.maybe_rollover()
+            self.assertIs(spooled.rolled_over, True)
+
+            temp_path = Path(spooled.file_object.name)
+            assert temp_path.name == 'file.ext'
+            assert spooled.file_object.tell() == 2
+            spooled.file_object.flush()
+            assert temp_path.read_bytes() == b'123456'
+
+        assert spooled.file_object.closed
+        assert temp_path.exists() is False
+        assert temp_path.parent.exists() is False
+
+        with SpooledTemporaryFile2(file_name='file.ext', max_memory_size=5) as spooled:
+            spooled.file_object.write(b'123')
+        assert spooled.file_object.closed
+        self.assertIs(spooled.rolled_over, False)
+
+    def test_temp_file_hasher_spooled(self):
+        with TempFileHasher(file_name='foo.bar', expected_files_size=3, max_memory_size=10) as tfh:
+            tfh.write(b'123')
+            assert tfh.tell() == tfh.hasher.bytes_processed == 3
+            self.assertIs(tfh.temp_file.rolled_over, False)  # Nothing stored on disk
+            tfh.seek(0)
+            assert tfh.read() == b'123'
+        assert tfh.closed is True
+        assert tfh.hasher.hexdigest_dict()['md5'] == '202cb962ac59075b964b07152d234b70'
+
+        with TempFileHasher(file_name='foo.bar', hash_names=('md5',), max_memory_size=10) as tfh:
+            tfh.write(b'1234567890')
+            self.assertIs(tfh.temp_file.rolled_over, False)
+            tfh.write(b'X')
+            self.assertIs(tfh.temp_file.rolled_over, True)
+            path = Path(tfh.temp_file.file_object.name)
+            assert path.name == 'foo.bar'
+            tfh.flush()
+            assert path.read_bytes() == b'1234567890X'
+
+            # Avoid wrong hashes by non-linear writing:
+            tfh.seek(2)
+            with self.assertRaises(RuntimeError):
+                tfh.write(b'456')
+            tfh.seek(0, io.SEEK_END)
+            tfh.write(b'Y')
+        assert tfh.closed is True
+        assert path.exists() is False
+        assert tfh.hasher.hexdigest_dict() == {'md5': '03d80c0e803ca0506096ed602dd57f40'}
+
+        with self.assertRaises(EmptyFileError):
+            with TempFileHasher(file_name='foo.bar', max_memory_size=10):
+                pass
+
+        with self.assertRaises(FileSizeError):
+            with TempFileHasher(file_name='foo.bar', expected_files_size=99, max_memory_size=10) as tfh:
+                tfh.write(b'123')
+
     def test_temp_file_hasher_not_init_on_wrong_hash_name(self):
         # If one of the hash names are not supported, crash early, before the temp file is created
         # Otherwise we can ran into: "ResourceWarning: Implicitly cleaning up"
@@ -195,3 +584,83 @@ class TempFileUtilsTestCase(TestCase):
             cut_filename(file_name='1234567890_foobar.ext1.ext2', max_length=15),
             '1234567890.ext2',
         )
+
+
+class AsyncTempFileHasherTestCase(IsolatedAsyncioTestCase):
+    async def test_async_temp_file_hasher(self):
+        async with AsyncTempFileHasher(file_name='foo.bar', expected_files_size=3) as tfh:
+            await tfh.write(b'12')
+            await tfh.write(bytearray(b'3'))
+            assert tfh.tell() == tfh.hasher.bytes_processed == 3
+
+            path = Path(tfh.temp_file.file_object.name)
+            assert path.name == 'foo.bar'
+            await tfh.flush()
+            assert await asyncio.to_thread(path.read_bytes) == b'123'
+            assert tfh.closed is False
+
+        assert tfh.closed is True
+        assert await asyncio.to_thread(path.exists) is False
+        assert tfh.hasher.hexdigest_dict() == {
+            'md5': '202cb962ac59075b964b07152d234b70',
+            'sha1': '40bd001563085fc35165329ea1ff5c5ecbdbbeef',
+            'sha3_224': '602bdc204140db016bee5374895e5568ce422fabe17e064061d80097',
+        }
+
+        # Many chunks -> same result as the FileHasher:
+        chunks = [os.urandom(1000) for _ in range(20)]
+        with FileHasher() as file_hasher:
+            for chunk in chunks:
+                file_hasher(chunk)
+        async with AsyncTempFileHasher(file_name='foo.bar') as tfh:
+            for chunk in chunks:
+                await tfh.write(chunk)
+            await tfh.seek(0)
+            assert await tfh.read() == b''.join(chunks)
+        assert tfh.hasher.hexdigest_dict() == file_hasher.hexdigest_dict()
+
+    async def test_async_temp_file_hasher_errors(self):
+        with self.assertRaises(FileSizeError) as size_err:
+            async with AsyncTempFileHasher(file_name='foo.bar', hash_names=('md5',), expected_files_size=99) as tfh:
+                await tfh.write(b'123')
+
+                # Seeking back and forth is ok, until we are at the end of the file:
+                await tfh.seek(2)
+                await tfh.seek(0, io.SEEK_END)
+                await tfh.write(b'foobar')
+
+                # Seeking back and "overwrite" will result in wrong hashes -> error
+                await tfh.seek(2)
+                assert tfh.tell() == 2 and tfh.hasher.bytes_processed == 9
+                with self.assertRaises(RuntimeError) as write_err:
+                    await tfh.write(b'456')
+        self.assertEqual(
+            str(write_err.exception),
+            'Avoid non-linear writing to "foo.bar", because this will result in incorrect hashes!',
+        )
+        self.assertEqual(str(size_err.exception), "File 'foo.bar' is 9 Bytes in size, but should be 99 Bytes!")
+
+        with self.assertRaises(EmptyFileError):
+            async with AsyncTempFileHasher(file_name='foo.bar'):
+                pass
+
+        with self.assertRaises(ValueError) as err:
+            async with AsyncTempFileHasher(file_name='foo.bar', hash_names=('Bam!',)):
+                self.fail('Should not reach this point!')
+        self.assertEqual(str(err.exception), 'unsupported hash type Bam!')
+
+        with self.assertRaises(ValueError):
+            async with AsyncTempFileHasher(file_name='foo.bar') as tfh:
+                await tfh.write(b'123')
+                raise ValueError()
+        assert tfh.closed is True
+
+    async def test_async_temp_file_hasher_spooled(self):
+        async with AsyncTempFileHasher(file_name='foo.bar', hash_names=('md5',), max_memory_size=10) as tfh:
+            await tfh.write(b'1234567890')
+            await tfh.flush()
+            self.assertIs(tfh.temp_file.rolled_over, False)
+            await tfh.write(b'XY')
+            await tfh.flush()
+            self.assertIs(tfh.temp_file.rolled_over, True)
+        assert tfh.hasher.hexdigest_dict() == {'md5': '03d80c0e803ca0506096ed602dd57f40'}
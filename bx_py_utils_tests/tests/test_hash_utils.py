@@ -1,11 +1,21 @@
+import io
+import os
 from unittest import TestCase
 
 from bx_py_utils.dict_utils import DictCompareResult
 from bx_py_utils.hash_utils import (
+    ALPHABET,
+    HashCollector,
+    HashVerifyReport,
+    cached_url_safe_hash,
     collect_hashes,
     compare_hashes,
     url_safe_encode,
+    url_safe_encode_many,
     url_safe_hash,
+    url_safe_hash_many,
+    url_safe_hash_stream,
+    verify_hashes,
 )
 
 
@@ -13,6 +23,24 @@ class HastUtilsTestCase(TestCase):
     def test_url_safe_encode(self):
         assert url_safe_encode(b'\x00\x01\x02\xfd\xfe\xff') == '-._GHJ'
 
+        # Same results as the "old" pure python implementation:
+        def old_url_safe_encode(data, alphabet):
+            return ''.join(alphabet[char % len(alphabet)] for char in data)
+
+        all_bytes = bytes(range(256))
+        random_bytes = os.urandom(512)
+        for alphabet in (ALPHABET, 'ab', 'äöü'):
+            for data in (b'', all_bytes, random_bytes):
+                self.assertEqual(url_safe_encode(data, alphabet=alphabet), old_url_safe_encode(data, alphabet))
+
+    def test_url_safe_encode_many(self):
+        self.assertEqual(url_safe_encode_many([]), [])
+        self.assertEqual(
+            url_safe_encode_many([b'\x00\x01\x02', b'', b'\xfd\xfe\xff']),
+            ['-._', '', 'GHJ'],
+        )
+        self.assertEqual(url_safe_encode_many([b'\x00\x01\x02'], alphabet='äö'), ['äöä'])
+
     def test_url_safe_hash(self):
         assert url_safe_hash('foobar') == (
             'J45l_w.05QsjdV32~D-2hj-w2Jn8qL2FSkd2.vLhHZkGr-BmVrRpH-1LVgDJmMw_'
@@ -23,6 +51,63 @@ class HastUtilsTestCase(TestCase):
             assert url_safe_hash('foobar', max_size=9999)
         assert cm.exception.args[0] == 'Hash digest too short for requested max size!'
 
+    def test_cached_url_safe_hash(self):
+        cached_url_safe_hash.cache_clear()
+        self.addCleanup(cached_url_safe_hash.cache_clear)
+
+        self.assertEqual(cached_url_safe_hash('foobar', max_size=16), 'J45l_w.05QsjdV32')
+        self.assertEqual(cached_url_safe_hash('foobar', max_size=16), 'J45l_w.05QsjdV32')
+        self.assertEqual(cached_url_safe_hash('foobar', max_size=8), 'J45l_w.0')
+        self.assertEqual(
+            cached_url_safe_hash('foobar', max_size=16, hasher_name='md5'),
+            url_safe_hash('foobar', max_size=16, hasher_name='md5'),
+        )
+        cache_info = cached_url_safe_hash.cache_info()
+        self.assertEqual((cache_info.hits, cache_info.misses, cache_info.currsize), (1, 3, 3))
+
+        # Errors are not cached:
+        for _ in range(2):
+            with self.assertRaises(AssertionError):
+                cached_url_safe_hash('foobar', max_size=9999)
+        self.assertEqual(cached_url_safe_hash.cache_info().currsize, 3)
+
+        cached_url_safe_hash.cache_clear()
+        cache_info = cached_url_safe_hash.cache_info()
+        self.assertEqual((cache_info.hits, cache_info.misses, cache_info.currsize), (0, 0, 0))
+
+    def test_url_safe_hash_many(self):
+        self.assertEqual(url_safe_hash_many([]), [])
+        self.assertEqual(
+            url_safe_hash_many(['foobar', b'foobar', 'bar'], max_size=16),
+            ['J45l_w.05QsjdV32', 'J45l_w.05QsjdV32', url_safe_hash('bar', max_size=16)],
+        )
+        data_list = ['', 'foo', 'äöü', b'\x00\xff']
+        self.assertEqual(
+            url_safe_hash_many(data_list, hasher_name='md5', encoding='latin-1'),
+            [url_safe_hash(data, hasher_name='md5', encoding='latin-1') for data in data_list],
+        )
+
+        with self.assertRaises(AssertionError) as cm:
+            url_safe_hash_many(['foobar'], max_size=9999)
+        assert cm.exception.args[0] == 'Hash digest too short for requested max size!'
+
+    def test_url_safe_hash_stream(self):
+        data = os.urandom(1000)
+        for chunk_size in (1, 7, 1000, 64 * 1024):
+            self.assertEqual(
+                url_safe_hash_stream(io.BytesIO(data), chunk_size=chunk_size),
+                url_safe_hash(data),
+            )
+        self.assertEqual(
+            url_safe_hash_stream(io.BytesIO(b'foobar'), max_size=16, hasher_name='sha256'),
+            url_safe_hash(b'foobar', max_size=16, hasher_name='sha256'),
+        )
+        self.assertEqual(url_safe_hash_stream(io.BytesIO(b'')), url_safe_hash(b''))
+
+        with self.assertRaises(AssertionError) as cm:
+            url_safe_hash_stream(io.BytesIO(b'foobar'), max_size=9999)
+        assert cm.exception.args[0] == 'Hash digest too short for requested max size!'
+
     def test_collect_hashes(self):
         self.assertEqual(
             collect_hashes({'sha1': 'foo', 'other': 1, 'md5': 123, 'baz': None, 'sha224': None}),
@@ -39,6 +124,31 @@ class HastUtilsTestCase(TestCase):
             {'foo': 1},
         )
 
+    def test_hash_collector(self):
+        records = [
+            {'sha1': 'foo', 'other': 1, 'md5': 123, 'baz': None, 'sha224': None},
+            {1: 2, 'sha1': 'foo', 3: 4, 'file_size': 1},
+            {'foo': 1, 2: 3},
+            {'md5': 'only'},
+            {},
+            {'sha1': 'bar', 'other': 2, 'md5': 456, 'baz': None, 'sha224': 'x'},  # Same layout as the first
+        ]
+        for extra_keys in ((), ('file_size',), ('foo', 'bar')):
+            collector = HashCollector(extra_keys=extra_keys)
+            expected = [collect_hashes(data, extra_keys=extra_keys) for data in records]
+            self.assertEqual([collector(data) for data in records], expected)
+            self.assertEqual(collector.collect_many(records), expected)
+            self.assertEqual(len(collector.layouts), 5)
+
+        # The compiled layouts are bounded:
+        collector = HashCollector()
+        collector.MAX_LAYOUTS = 2
+        self.assertEqual(
+            collector.collect_many([{'md5': 1}, {'sha1': 2}, {'md5': 3, 'x': 4}]),
+            [{'md5': 1}, {'sha1': 2}, {'md5': 3}],
+        )
+        self.assertEqual(len(collector.layouts), 1)
+
     def test_compare_hashes(self):
         # More deeper tests that also checks DictCompareResult.compare_successful()
 
@@ -173,3 +283,56 @@ class HastUtilsTestCase(TestCase):
             ),
         )
         self.assertIs(result.compare_successful(), True)
+
+    def test_verify_hashes(self):
+        unrelated_data = {'foo': 'bar', 'baz': 'qux'}
+        pairs = [
+            ({'md5': '123', **unrelated_data}, {'md5': '123', **unrelated_data}),  # correct
+            ({'md5': '123', 'sha1': 'foo'}, {'md5': '123', 'sha1': 'bar'}),  # wrong
+            ({'md5': '123'}, {'sha1': '123'}),  # skipped
+            ({'md5': '1', 'file_size': 1}, {'md5': '1', 'file_size': 2}),  # wrong, because of extra key
+            ({'file_size': 0}, {'file_size': 0}),  # correct via extra key
+            ({'md5': 1}, {'md5': True}),  # wrong type
+            ({}, {}),  # skipped
+        ]
+        current_items = [current for current, _ in pairs]
+        expected_items = [expected for _, expected in pairs]
+
+        report = verify_hashes(current_items, expected_items, extra_keys=('file_size',))
+        self.assertEqual(
+            report,
+            HashVerifyReport(correct=2, wrong=3, skipped=2, wrong_indices=[1, 3, 5], skipped_indices=[2, 6]),
+        )
+        self.assertIs(report.verify_successful(), False)
+
+        # Same result as compare_hashes() for every pair:
+        for index, (current, expected) in enumerate(pairs):
+            compare_successful = compare_hashes(current, expected, extra_keys=('file_size',)).compare_successful()
+            if compare_successful is None:
+                self.assertIn(index, report.skipped_indices)
+            elif compare_successful:
+                self.assertNotIn(index, report.skipped_indices + report.wrong_indices)
+            else:
+                self.assertIn(index, report.wrong_indices)
+
+        # Without extra keys:
+        report = verify_hashes(iter(current_items), iter(expected_items))
+        self.assertEqual(
+            report,
+            HashVerifyReport(correct=2, wrong=2, skipped=3, wrong_indices=[1, 5], skipped_indices=[2, 4, 6]),
+        )
+
+        # Stop after first wrong entry:
+        report = verify_hashes(current_items, expected_items, fail_fast=True)
+        self.assertEqual(
+            report,
+            HashVerifyReport(correct=1, wrong=1, skipped=0, wrong_indices=[1], skipped_indices=[]),
+        )
+
+        report = verify_hashes([{'md5': '1'}], [{'md5': '1'}])
+        self.assertIs(report.verify_successful(), True)
+        report = verify_hashes([], [])
+        self.assertIs(report.verify_successful(), None)
+
+        with self.assertRaises(ValueError):
+            verify_hashes([{}], [{}, {}])
@@ -1,7 +1,38 @@
+import gzip
+import json
+import os
+import pickle
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from unittest import TestCase
+from unittest import TestCase, skipUnless
+from unittest.mock import patch
 
-from bx_py_utils.path import assert_is_dir, assert_is_file, read_json_file, write_json_file
+from bx_py_utils.dict_utils import dict_get
+from bx_py_utils.path import (
+    _LAZY_JSON_FILES,
+    assert_is_dir,
+    assert_is_file,
+    iter_json_lines,
+    orjson,
+    read_json_file,
+    write_json_file,
+    write_json_files,
+    write_json_lines,
+)
+
+
+try:
+    from compression import zstd  # noqa: F401
+except ImportError:
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        HAS_ZSTD = False
+    else:
+        HAS_ZSTD = True
+else:
+    HAS_ZSTD = True
 
 
 class PathTestCase(TestCase):
@@ -45,6 +76,82 @@ class PathTestCase(TestCase):
             'foo': ['bar', 42],
         }
 
+    def test_read_json_file_lazy(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            json_path = Path(temp_dir) / 'file.json'
+            json_path.write_text('{"foo": {"bar": [1, [2]]}, "baz": null}')
+
+            data = read_json_file(json_path, lazy=True)
+            self.assertIsInstance(data, dict)
+            self.assertEqual(data, read_json_file(json_path))
+            self.assertEqual(dict_get(data, 'foo', 'bar'), [1, [2]])
+            self.assertEqual(json.dumps(data), json.dumps(read_json_file(json_path)))
+            self.assertEqual(pickle.loads(pickle.dumps(data)), data)
+
+            # The cached data is shared, so it's read-only:
+            with self.assertRaisesRegex(TypeError, 'Cached JSON data is read-only!'):
+                data['new'] = 1
+            with self.assertRaises(TypeError):
+                data['foo'].pop('bar')
+            with self.assertRaises(TypeError):
+                data['foo']['bar'].append(3)
+            with self.assertRaises(TypeError):
+                data['foo']['bar'][1][0] = 3
+            self.assertEqual(data, read_json_file(json_path))
+
+            # A copy is modifiable:
+            data_copy = dict(data)
+            data_copy['new'] = 1
+
+            # Unchanged file -> the same, already parsed, data:
+            self.assertIs(read_json_file(str(json_path), lazy=True), data)
+
+            # Changed file -> parsed again:
+            json_path.write_text('["changed", ["nested"]]')
+            data2 = read_json_file(json_path, lazy=True)
+            self.assertEqual(data2, ['changed', ['nested']])
+            self.assertIsInstance(data2, list)
+            with self.assertRaises(TypeError):
+                data2.append('modified')
+            with self.assertRaises(TypeError):
+                data2[1] += ['modified']
+
+            # Only the current version of a file is cached:
+            self.assertIs(_LAZY_JSON_FILES[json_path][1], data2)
+            self.assertEqual(len([entry for entry in _LAZY_JSON_FILES.values() if entry[1] is data]), 0)
+
+    def test_read_json_file_lazy_cache_size(self):
+        with tempfile.TemporaryDirectory() as temp_dir, patch('bx_py_utils.path.LAZY_JSON_FILES_MAX_SIZE', 2):
+            temp_path = Path(temp_dir)
+            for name in ('1', '2', '3'):
+                (temp_path / f'{name}.json').write_text(f'[{name}]')
+
+            data1 = read_json_file(temp_path / '1.json', lazy=True)
+            read_json_file(temp_path / '2.json', lazy=True)
+            self.assertIs(read_json_file(temp_path / '1.json', lazy=True), data1)  # Most recently used now
+            read_json_file(temp_path / '3.json', lazy=True)
+
+            self.assertIn(temp_path / '1.json', _LAZY_JSON_FILES)
+            self.assertNotIn(temp_path / '2.json', _LAZY_JSON_FILES)
+            self.assertIn(temp_path / '3.json', _LAZY_JSON_FILES)
+
+    def test_read_json_file_lazy_threads(self):
+        with tempfile.TemporaryDirectory() as temp_dir, patch('bx_py_utils.path.LAZY_JSON_FILES_MAX_SIZE', 3):
+            temp_path = Path(temp_dir)
+            paths = []
+            for number in range(10):
+                json_path = temp_path / f'{number}.json'
+                json_path.write_text(f'{{"number": {number}}}')
+                paths.append(json_path)
+
+            def read_all(_):
+                return [read_json_file(json_path, lazy=True)['number'] for json_path in paths * 20]
+
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                results = list(executor.map(read_all, range(8)))
+            self.assertEqual(results, [list(range(10)) * 20] * 8)
+            self.assertLessEqual(len(_LAZY_JSON_FILES), 3)
+
     def test_write_json_file(self):
         obj = {
             'foo': ['bär', 42],
@@ -58,3 +165,122 @@ class PathTestCase(TestCase):
         with self.assertRaises(TypeError):
             write_json_file(json_path, {object(): 'not JSON'}, ensure_ascii=False)
         assert not broken_json_path.exists()
+
+    def test_write_json_file_durability(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            json_path = Path(temp_dir) / 'file.json'
+            with patch('bx_py_utils.path.os.fsync', wraps=os.fsync) as fsync_mock:
+                write_json_file(json_path, {'foo': 1})
+                self.assertEqual(fsync_mock.call_count, 0)
+                write_json_file(json_path, {'foo': 2}, durability='file')
+                self.assertEqual(fsync_mock.call_count, 1)
+                write_json_file(json_path, {'foo': 3}, durability='file+dir')
+                self.assertEqual(fsync_mock.call_count, 3 if os.name != 'nt' else 2)
+            self.assertEqual(read_json_file(json_path), {'foo': 3})
+            self.assertEqual(os.listdir(temp_dir), ['file.json'])  # No temp files left
+
+    def test_write_json_file_streaming(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            json_path = Path(temp_dir) / 'file.json'
+            # The document is written in parts and never build completely in memory:
+            with patch('bx_py_utils.path.json.dumps', side_effect=AssertionError('Not streamed!')):
+                write_json_file(json_path, {'foo': ['bär', 42]}, ensure_ascii=False, indent=1)
+            self.assertEqual(json_path.read_text(encoding='utf-8'), '{\n "foo": [\n  "bär",\n  42\n ]\n}')
+
+            with self.assertRaises(TypeError):
+                write_json_file(json_path, {'broken': object()})
+            self.assertEqual(os.listdir(temp_dir), ['file.json'])
+            self.assertEqual(read_json_file(json_path), {'foo': ['bär', 42]})
+
+    def test_write_json_file_fast(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            json_path = Path(temp_dir) / 'file.json'
+            write_json_file(json_path, {'foo': ['bär', 42], 'bar': None}, fast=True)
+            self.assertEqual(json_path.read_text(encoding='utf-8'), '{"foo":["bär",42],"bar":null}')
+
+            # Non-str keys are converted, with and without orjson:
+            for orjson_module in (orjson, None):
+                with self.subTest(orjson=orjson_module), patch('bx_py_utils.path.orjson', orjson_module):
+                    write_json_file(json_path, {1: 'one', None: 'none', False: 'false'}, fast=True)
+                    self.assertEqual(json_path.read_text(encoding='utf-8'), '{"1":"one","null":"none","false":"false"}')
+
+            with self.assertRaises(AssertionError) as cm:
+                write_json_file(json_path, {}, fast=True, indent=2)
+            self.assertEqual(cm.exception.args, ('json_kwargs are not supported in fast mode!',))
+
+    def test_write_json_files(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+            (temp_path / 'sub').mkdir()
+            files = {
+                temp_path / 'one.json': {'one': 1},
+                str(temp_path / 'two.json'): [2],
+                temp_path / 'sub' / 'three.json': {'three': 3},
+            }
+            with patch('bx_py_utils.path.os.fsync', wraps=os.fsync) as fsync_mock:
+                write_json_files(files, durability='file+dir', indent=2)
+            # Every file + every directory only once:
+            self.assertEqual(fsync_mock.call_count, 5 if os.name != 'nt' else 3)
+
+            for path, data in files.items():
+                self.assertEqual(read_json_file(path), data)
+            self.assertEqual((temp_path / 'one.json').read_text(), '{\n  "one": 1\n}')
+
+    def test_json_lines(self):
+        items = [{'foo': ['bär', 42]}, [1, 2], 'text', None]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+
+            json_path = temp_path / 'file.jsonl'
+            self.assertEqual(write_json_lines(json_path, iter(items), ensure_ascii=False), 4)
+            self.assertEqual(
+                json_path.read_text(encoding='utf-8'),
+                '{"foo": ["bär", 42]}\n[1, 2]\n"text"\nnull\n',
+            )
+            self.assertEqual(list(iter_json_lines(json_path)), items)
+
+            # Empty lines are skipped:
+            json_path.write_text('\n1\n\n2\n')
+            self.assertEqual(list(iter_json_lines(str(json_path))), [1, 2])
+
+            # Small buffer, durability and gzip:
+            gzip_path = temp_path / 'file.jsonl.gz'
+            many_items = [{'number': number} for number in range(1000)]
+            self.assertEqual(
+                write_json_lines(gzip_path, many_items, buffer_size=100, durability='file+dir'),
+                1000,
+            )
+            with gzip.open(gzip_path, 'rt') as gzip_file:
+                self.assertEqual(gzip_file.readline(), '{"number": 0}\n')
+            self.assertEqual(list(iter_json_lines(gzip_path)), many_items)
+
+            # gzip is detected by content, not by file name:
+            gzip_path.rename(json_path)
+            self.assertEqual(list(iter_json_lines(json_path)), many_items)
+
+            # Nothing left behind:
+            self.assertEqual(os.listdir(temp_dir), ['file.jsonl'])
+
+            with self.assertRaises(TypeError):
+                write_json_lines(temp_path / 'broken.jsonl', [1, object()])
+            self.assertEqual(os.listdir(temp_dir), ['file.jsonl'])
+
+            with self.assertRaises(AssertionError) as cm:
+                write_json_lines(json_path, items, indent=2)
+            self.assertEqual(cm.exception.args, ('JSON Lines can not be indented!',))
+
+    @skipUnless(HAS_ZSTD, 'Needs Python 3.14 or "zstandard" package')
+    def test_json_lines_zstd(self):
+        items = [{'number': number} for number in range(100)]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            zstd_path = Path(temp_dir) / 'file.jsonl.zst'
+            self.assertEqual(write_json_lines(zstd_path, items), 100)
+            self.assertEqual(zstd_path.read_bytes()[:4], b'\x28\xb5\x2f\xfd')
+            self.assertEqual(list(iter_json_lines(zstd_path)), items)
+
+            # Files with multiple frames (e.g. appended or written by "pzstd") are read completely:
+            other_path = Path(temp_dir) / 'other.jsonl.zst'
+            write_json_lines(other_path, [{'frame': 2}])
+            with zstd_path.open('ab') as file_object:
+                file_object.write(other_path.read_bytes())
+            self.assertEqual(list(iter_json_lines(zstd_path)), [*items, {'frame': 2}])
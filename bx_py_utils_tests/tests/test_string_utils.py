@@ -1,7 +1,37 @@
-from unittest import TestCase
+import pickle
+import random
+from unittest import TestCase, skipIf
 from uuid import UUID
 
-from bx_py_utils.string_utils import compare_sentences, ensure_lf, get_words, levenshtein_distance, uuid_from_text
+from bx_py_utils.string_utils import (
+    SentenceIndex,
+    WordTokenizer,
+    _levenshtein_banded,
+    _levenshtein_distance,
+    _levenshtein_myers,
+    are_uuids,
+    cached_uuid_from_text,
+    compare_sentences,
+    ensure_lf,
+    get_words,
+    invalid_uuid_indices,
+    is_uuid,
+    levenshtein_distance,
+    parse_uuids,
+    uuid_from_text,
+)
+from bx_py_utils.string_utils import rapidfuzz_levenshtein as rapidfuzz
+
+
+def levenshtein_reference(word1, word2):
+    # The "old" classic implementation
+    previous_row = range(len(word2) + 1)
+    for i, c1 in enumerate(word1):
+        current_row = [i + 1]
+        for j, c2 in enumerate(word2):
+            current_row.append(min(previous_row[j + 1] + 1, current_row[j] + 1, previous_row[j] + (c1 != c2)))
+        previous_row = current_row
+    return previous_row[-1]
 
 
 class StringUtilsTestCase(TestCase):
@@ -14,6 +44,53 @@ class StringUtilsTestCase(TestCase):
         self.assertEqual(levenshtein_distance('', ''), 0)
         self.assertEqual(levenshtein_distance('orchestration', 'container'), 10)
 
+        # Stop early:
+        self.assertEqual(levenshtein_distance('orchestration', 'container', max_distance=10), 10)
+        self.assertEqual(levenshtein_distance('orchestration', 'container', max_distance=9), 10)
+        self.assertEqual(levenshtein_distance('orchestration', 'container', max_distance=2), 3)
+        self.assertEqual(levenshtein_distance('book', 'back', max_distance=0), 1)
+        self.assertEqual(levenshtein_distance('book', 'book', max_distance=0), 0)
+        self.assertEqual(levenshtein_distance('', 'test', max_distance=5), 4)
+
+    def test_levenshtein_distance_python(self):
+        rnd = random.Random(1)
+        for _ in range(500):
+            word1 = ''.join(rnd.choices('abcä', k=rnd.randint(0, 12)))
+            word2 = ''.join(rnd.choices('abcä', k=rnd.randint(0, 12)))
+            distance = levenshtein_reference(word1, word2)
+            self.assertEqual(_levenshtein_myers(word1, word2), distance)
+            self.assertEqual(_levenshtein_banded(word1, word2), distance)
+            self.assertEqual(_levenshtein_distance(word1, word2), distance)
+            for max_distance in range(14):
+                expected = min(distance, max_distance + 1)
+                self.assertEqual(_levenshtein_banded(word1, word2, max_distance=max_distance), expected)
+                self.assertEqual(_levenshtein_distance(word1, word2, max_distance=max_distance), expected)
+
+        # Long strings: Myers uses more than one machine word and the banded variant is used with max_distance:
+        for length in (63, 64, 65, 200):
+            word1 = ''.join(rnd.choices('abc', k=length))
+            word2 = ''.join(rnd.choices('abc', k=length + rnd.randint(-5, 5)))
+            distance = levenshtein_reference(word1, word2)
+            self.assertEqual(_levenshtein_myers(word1, word2), distance)
+            self.assertEqual(_levenshtein_distance(word1, word2), distance)
+            for max_distance in (0, 5, distance, 100):
+                self.assertEqual(
+                    _levenshtein_distance(word1, word2, max_distance=max_distance),
+                    min(distance, max_distance + 1),
+                )
+
+    @skipIf(rapidfuzz is None, 'Needs "rapidfuzz" package')
+    def test_levenshtein_distance_rapidfuzz(self):
+        rnd = random.Random(1)
+        for _ in range(500):
+            word1 = ''.join(rnd.choices('abcä', k=rnd.randint(0, 12)))
+            word2 = ''.join(rnd.choices('abcä', k=rnd.randint(0, 12)))
+            for max_distance in (None, 0, 1, 5):
+                self.assertEqual(
+                    levenshtein_distance(word1, word2, max_distance=max_distance),
+                    _levenshtein_distance(word1, word2, max_distance=max_distance),
+                )
+
     def test_get_words(self):
         self.assertEqual(get_words('One, two!'), ['one', 'two'])
         self.assertEqual(get_words("It's okay!"), ['its', 'okay'])
@@ -24,11 +101,43 @@ class StringUtilsTestCase(TestCase):
             ['cd', 'hij'],
         )
 
+    def test_word_tokenizer(self):
+        texts = [
+            'test Äöüß!',
+            '12 123 1234',
+            'A AB cd EfG hij',
+            '  Multiple   spaces, and -dashes-  ',
+            '',
+        ]
+        for kwargs in (
+            {},
+            {'min_word_length': 3},
+            {'min_word_length': 2, 'ignore_words': ('ab', 'efg')},
+            {'to_lower': False, 'ignore_words': ['A']},
+        ):
+            with self.subTest(kwargs=kwargs):
+                tokenizer = WordTokenizer(**kwargs)
+                self.assertEqual(tokenizer.tokenize_many(texts), [get_words(text, **kwargs) for text in texts])
+
+        tokenizer = WordTokenizer(cache_size=2)
+        words = tokenizer('One, two!')
+        self.assertEqual(words, ['one', 'two'])
+        words.append('modified')  # Results are copies of the cached values
+        self.assertEqual(tokenizer('One, two!'), ['one', 'two'])
+        self.assertEqual(tokenizer.cache_info().hits, 1)
+        tokenizer.cache_clear()
+        self.assertEqual(tokenizer.cache_info().currsize, 0)
+
+        clone = pickle.loads(pickle.dumps(tokenizer))
+        self.assertEqual(clone('One, two!'), ['one', 'two'])
+        self.assertEqual(clone.cache_info().maxsize, 2)
+
     def test_compare_sentences(self):
         self.assertEqual(compare_sentences('planet', 'planetary'), 3)
         self.assertEqual(compare_sentences('orchestration', 'container'), 10)
 
         self.assertEqual(compare_sentences('This is the SAME!', 'this is the same'), 0)
+        self.assertEqual(compare_sentences('orchestration', 'container', max_distance=5), 6)
 
         # If "min_word_length" and "ignore_words" filters the complete content,
         # then we get None back:
@@ -48,11 +157,101 @@ class StringUtilsTestCase(TestCase):
             0,
         )
 
+    def test_sentence_index(self):
+        rnd = random.Random(1)
+        words = ('planet', 'planetary', 'container', 'orchestration', 'music', 'musical', 'box', 'stories')
+        texts = [' '.join(rnd.choices(words, k=rnd.randint(1, 3))).title() for _ in range(80)]
+        texts += ['', 'a b c', 'Planet!', 'planet']  # completely filtered, and duplicates
+
+        index = SentenceIndex()
+        index.add_many(texts)
+        self.assertEqual(len(index.texts), 84)
+
+        for max_distance in (0, 2, 5):
+            # Same result as comparing all texts via compare_sentences():
+            for query in ('planet', 'the musical box', 'orchestration stories', 'nothing in here', '?'):
+                expected = [
+                    (other_index, distance)
+                    for other_index, text in enumerate(texts)
+                    if (distance := compare_sentences(query, text)) is not None and distance <= max_distance
+                ]
+                expected.sort(key=lambda item: (item[1], item[0]))
+                self.assertEqual(index.find(query, max_distance=max_distance), expected)
+
+            expected = []
+            for index1, text1 in enumerate(texts):
+                for index2 in range(index1 + 1, len(texts)):
+                    distance = compare_sentences(text1, texts[index2])
+                    if distance is not None and distance <= max_distance:
+                        expected.append((index1, index2, distance))
+            self.assertEqual(index.find_near_duplicates(max_distance=max_distance), expected)
+
+        self.assertEqual(
+            index.find_near_duplicates(max_distance=2, workers=2),
+            index.find_near_duplicates(max_distance=2),
+        )
+
+        self.assertEqual(SentenceIndex().find('foobar', max_distance=10), [])
+        self.assertEqual(SentenceIndex().find_near_duplicates(max_distance=10), [])
+
+    def test_batch_uuid_validation(self):
+        def is_uuid_reference(text):
+            try:
+                UUID(text)
+            except ValueError:
+                return False
+            return True
+
+        uuid = '0808f64e-60d5-8979-fcb6-76c96ec93827'
+        texts = [
+            uuid,
+            uuid.upper(),
+            uuid.replace('-', ''),
+            f'{{{uuid}}}',
+            f'urn:uuid:{uuid}',
+            f'uuid:{uuid}',
+            f'{{{{{uuid}}}',  # UUID() strips any number of braces
+            f'{uuid[:10]}-{uuid[10:]}',  # UUID() removes all hyphens
+            f' {uuid.replace("-", "")[1:]}',  # int() accepts leading whitespace
+            f'0x{uuid.replace("-", "")[2:]}',  # int() accepts a base prefix
+            f'{uuid}0',
+            uuid[:-1],
+            uuid.replace('0', 'g'),
+            f'[{uuid}]',
+            '',
+            'foo',
+            '-' * 40,
+        ]
+        expected = [is_uuid_reference(text) for text in texts]
+        self.assertEqual([is_uuid(text) for text in texts], expected)
+        self.assertEqual(are_uuids(texts), bytearray(expected))
+        self.assertEqual(
+            invalid_uuid_indices(texts), [index for index, valid in enumerate(expected) if not valid]
+        )
+        self.assertEqual(
+            parse_uuids(texts), [UUID(text) if valid else None for text, valid in zip(texts, expected)]
+        )
+
+        # Works with generators, too:
+        self.assertEqual(are_uuids(text for text in ('foo', uuid)), bytearray([0, 1]))
+        self.assertEqual(invalid_uuid_indices(iter(())), [])
+
     def test_uuid_from_text(self):
         self.assertEqual(uuid_from_text('foo'), UUID('0808f64e-60d5-8979-fcb6-76c96ec93827'))
         self.assertEqual(uuid_from_text('foo'), UUID('0808f64e-60d5-8979-fcb6-76c96ec93827'))
         self.assertEqual(uuid_from_text('bar'), UUID('07daf010-de7f-7f0d-8d76-a76eb8d1eb40'))
 
+    def test_cached_uuid_from_text(self):
+        cached_uuid_from_text.cache_clear()
+        self.addCleanup(cached_uuid_from_text.cache_clear)
+
+        self.assertEqual(cached_uuid_from_text('foo'), UUID('0808f64e-60d5-8979-fcb6-76c96ec93827'))
+        self.assertEqual(cached_uuid_from_text('foo'), UUID('0808f64e-60d5-8979-fcb6-76c96ec93827'))
+        self.assertEqual(cached_uuid_from_text('bar'), uuid_from_text('bar'))
+
+        cache_info = cached_uuid_from_text.cache_info()
+        self.assertEqual((cache_info.hits, cache_info.misses, cache_info.currsize), (1, 2, 2))
+
     def test_ensure_lf(self):
         self.assertEqual(ensure_lf('foo\r\nbar'), 'foo\nbar')
         self.assertEqual(ensure_lf('foo\rbar'), 'foo\nbar')